@@ -1,61 +1,32 @@
-import json
+import sys
+from pathlib import Path
 
 import altair as alt
-import geopandas as gpd
-import pandas as pd
-import requests
 from maplibre import render_maplibregl
 from maplibre.controls import NavigationControl
 from maplibre.map import Map
-from shiny.express import render, ui
+from shiny import reactive
+from shiny.express import app_opts, input, render, ui
 from shinywidgets import render_altair
 
-# Download the JSON data
-url = "https://portal.pyladies.com/stats.json"
-response = requests.get(url)
-data = response.json()
-stats = data["stats"]
-
-# dictionary of DataFrames keyed by chart_id
-breakdown_dfs = {}
-for item in stats["volunteer_breakdown"]:
-    breakdown_dfs[item["chart_id"]] = pd.DataFrame(
-        item["data"], columns=item["columns"]
-    )
+# Make the shared pyladies_dashboard package importable when the app is
+# launched from its own directory
+repo_root = str(Path(__file__).resolve().parents[1])
+if repo_root not in sys.path:
+    sys.path.insert(0, repo_root)
+from pyladies_dashboard import assets, data, maps, refresh, tiles  # noqa: E402
 
-# Access individual DataFrames
-df_by_chapter = (
-    breakdown_dfs["volunteer_by_chapter"]
-    .sort_values("Chapter")
-    .reset_index(drop=True)
-)
-df_by_region = (
-    breakdown_dfs["volunteers_by_region"]
-    .sort_values("Volunteers")
-    .reset_index(drop=True)
-)
-df_by_language = (
-    breakdown_dfs["volunteers_by_languages"]
-    .sort_values("Language")
-    .reset_index(drop=True)
-)
+# Stats, the chapter CSV merge and the world geometry are cached once per
+# process in the shared data layer and refreshed in the background;
+# sessions pick up new versions through a cheap in-memory poll
+refresh.start_scheduler()
+stats_data = refresh.stats_poll()
 
-df = pd.read_csv("app-volunteer/chapter_geocoded.csv")[
-    [
-        "chapter",
-        "latitude",
-        "longitude",
-        "country",
-        "continent",
-    ]
-]
 
-df_by_chapter_geocode = df_by_chapter.merge(
-    df,
-    left_on="Chapter",
-    right_on="chapter",
-    how="left",
-).drop(columns=["chapter"])
+@reactive.calc
+def frames():
+    return data.volunteer_frames(stats_data())
+
 
 # Include custom CSS
 ui.tags.head(
@@ -69,89 +40,31 @@ ui.tags.head(
 """)
 )
 
-# world data -----
+# map tiles -----
 
-# Load world geometries from geopandas
-# world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres"))
-world = gpd.read_file(
-    "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip"
-)
-world = world[["CONTINENT", "geometry"]].rename(
-    columns={"CONTINENT": "continent"}
-)
+# The continent overlay is cut into a vector tile archive per data
+# version, served from /tiles so browsers only fetch tiles in view; the
+# chapters are clustered on the server for the view instead
+app_opts(static_assets=assets.static_assets())
 
-# Create a mapping of continent names from df_by_region to world dataset
-continent_mapping = {
-    "Africa": "Africa",
-    "Asia": "Asia",
-    "Europe": "Europe",
-    "North America": "North America",
-    "South America": "South America",
-    "Oceania": "Oceania",
-}
 
-# Create a dictionary of volunteer counts by continent
-continent_volunteers = df_by_region.set_index("Region")["Volunteers"].to_dict()
+@reactive.calc
+def tile_url():
+    return tiles.source_url(data.volunteer_tiles(stats_data()))
 
-# Add volunteer counts to world data based on continent
-world["Volunteers"] = world["continent"].map(continent_volunteers)
 
-# Filter to only continents that have data
-world_filtered = world[
-    world["continent"].isin(df_by_region["Region"].tolist())
-].copy()
-
-# Create GeoJSON from filtered data
-geojson_data = json.loads(
-    world_filtered[["continent", "Volunteers", "geometry"]].to_json()
-)
-
-# Rename properties to proper display names
-for feature in geojson_data["features"]:
-    continent_name = feature["properties"]["continent"]
-    volunteer_count = feature["properties"]["Volunteers"]
-
-    feature["properties"] = {
-        "Continent": continent_name,
-        "Volunteers": volunteer_count,
-    }
-
-# begin app -----
-
-# Page setup
-ui.page_opts(title="Community Conference Dashboard", fillable=True, id="page")
-
-# Placeholder for map (you'll add your actual map here)
-with ui.card():
-    ui.card_header("Total Volunteers by Continent")
-
-    @render_maplibregl
-    def mapgl():
-        # Create the map
-        m = Map(
-            center=(0, 20),
-            zoom=1.5,
-            style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
-        )
-
-        # Add navigation control
-        m.add_control(
-            NavigationControl(
-                show_compass=False,
-                show_zoom=True,
-                position="top-right",
-                visualize_pitch=False,
-            )
-        )
+# Overlay outlines take the page background color
+OUTLINE = {"light": "#ffffff", "dark": "#1d1f21"}
 
-        # Add GeoJSON source
-        m.add_source("continents", {"type": "geojson", "data": geojson_data})
 
-        # Add fill layer with color based on volunteer count
-        m.add_layer({
+# Fill layer with color based on volunteer count, and outline layer
+def continent_layers(theme):
+    return [
+        {
             "id": "continent-fills",
             "type": "fill",
-            "source": "continents",
+            "source": "volunteers",
+            "source-layer": "continents",
             "paint": {
                 "fill-color": [
                     "interpolate",
@@ -170,69 +83,22 @@ with ui.card():
                 ],
                 "fill-opacity": 0.7,
             },
-        })
-
-        # Add outline layer
-        m.add_layer({
+        },
+        {
             "id": "continent-borders",
             "type": "line",
-            "source": "continents",
-            "paint": {"line-color": "#ffffff", "line-width": 1},
-        })
-
-        # Add popup on hover
-        m.add_tooltip("continent-fills")
-        return m
-
-
-with ui.card():
-    ui.card_header("Our Chapter Volunteers")
-
-    @render_maplibregl
-    def chapter_map():
-        # Create GeoJSON from the geocoded chapter data
-        chapters_geojson = {
-            "type": "FeatureCollection",
-            "features": [
-                {
-                    "type": "Feature",
-                    "properties": {
-                        "Chapter": row["Chapter"],
-                        "Volunteers": row["Volunteers"],
-                        "Country": row["country"],
-                    },
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [row["longitude"], row["latitude"]],
-                    },
-                }
-                for _, row in df_by_chapter_geocode.iterrows()
-                if pd.notna(row["latitude"]) and pd.notna(row["longitude"])
-            ],
-        }
-
-        # Create the map
-        m = Map(
-            center=(20, 10),
-            zoom=1.5,
-            style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
-        )
-
-        # Add navigation control
-        m.add_control(
-            NavigationControl(
-                show_compass=False,
-                show_zoom=True,
-                position="top-right",
-                visualize_pitch=False,
-            )
-        )
+            "source": "volunteers",
+            "source-layer": "continents",
+            "paint": {"line-color": OUTLINE[theme], "line-width": 1},
+        },
+    ]
 
-        # Add GeoJSON source for chapters
-        m.add_source("chapters", {"type": "geojson", "data": chapters_geojson})
 
-        # Add circle layer with size and color based on volunteer count
-        m.add_layer({
+# Circle layer with size and color based on volunteer count, of single
+# chapters and of clusters alike
+def chapter_layers(theme):
+    return [
+        {
             "id": "chapter-circles",
             "type": "circle",
             "source": "chapters",
@@ -249,6 +115,10 @@ with ui.card():
                     15,
                     9,
                     20,
+                    50,
+                    28,
+                    200,
+                    36,
                 ],
                 "circle-color": [
                     "interpolate",
@@ -262,24 +132,203 @@ with ui.card():
                     "#ef3b2c",
                     9,
                     "#cb181d",
+                    50,
+                    "#a50f15",
+                    200,
+                    "#67000d",
                 ],
                 "circle-opacity": 0.8,
                 "circle-stroke-width": 2,
-                "circle-stroke-color": "#ffffff",
+                "circle-stroke-color": OUTLINE[theme],
             },
-        })
+        },
+    ]
 
-        # Add popup on hover
-        m.add_tooltip("chapter-circles")
 
+# begin app -----
+
+# Page setup
+ui.page_opts(title="Community Conference Dashboard", fillable=True, id="page")
+ui.input_dark_mode(id="dark_mode")
+
+
+@reactive.calc
+def theme():
+    # "light" or "dark", light until the browser has reported its mode
+    return input.dark_mode() if "dark_mode" in input else "light"
+
+
+# Placeholder for map (you'll add your actual map here)
+with ui.card():
+    ui.card_header("Total Volunteers by Continent")
+
+    @render_maplibregl
+    def mapgl():
+        # Data and theme changes are applied to the live map by
+        # follow_source and follow_theme below
+        with reactive.isolate():
+            url = tile_url()
+            mode = theme()
+
+        # Create the map
+        m = Map(
+            center=(0, 20),
+            zoom=1.5,
+            style=assets.basemap_style_url(mode),
+        )
+
+        # Add navigation control
+        m.add_control(
+            NavigationControl(
+                show_compass=False,
+                show_zoom=True,
+                position="top-right",
+                visualize_pitch=False,
+            )
+        )
+
+        # Add vector tile source and layers
+        m.add_source("volunteers", {"type": "vector", "url": url})
+        for layer in continent_layers(mode):
+            m.add_layer(layer)
+
+        # Add popup on hover
+        m.add_tooltip("continent-fills")
         return m
 
+    maps.follow_source(
+        "mapgl", "volunteers", tile_url, lambda: continent_layers(theme())
+    )
+    maps.follow_theme("mapgl", theme, continent_layers)
+
+
+# Where nearby chapters are looked up from: the last map click or the
+# browser's position, as (longitude, latitude)
+origin = reactive.value(None)
+
+
+@reactive.effect
+@reactive.event(input.chapter_map_clicked)
+def _origin_from_click():
+    coords = input.chapter_map_clicked()["coords"]
+    origin.set((coords["lng"], coords["lat"]))
+
+
+@reactive.effect
+@reactive.event(input.near_me)
+def _origin_from_browser():
+    position = input.near_me()
+    origin.set((position["lng"], position["lat"]))
+
+
+with ui.card():
+    ui.card_header("Our Chapter Volunteers")
+
+    with ui.layout_sidebar():
+        # Lookups only touch the sidebar: the map below never reads them
+        with ui.sidebar(position="right", title="Nearby chapters"):
+            ui.tags.button(
+                "Near me",
+                class_="btn btn-outline-primary btn-sm",
+                onclick=(
+                    "navigator.geolocation.getCurrentPosition(p =>"
+                    " Shiny.setInputValue('near_me', {lng:"
+                    " p.coords.longitude, lat: p.coords.latitude},"
+                    " {priority: 'event'}))"
+                ),
+            )
+            ui.input_numeric("nearby_k", "Closest chapters", 5, min=1, max=50)
+            ui.input_numeric(
+                "nearby_radius", "Radius (km)", 1000, min=0, step=100
+            )
+
+            @render.text
+            def nearby_summary():
+                if origin() is None:
+                    return "Click the map to find the chapters near it."
+                radius = max(input.nearby_radius() or 0, 0)
+                within = data.chapter_index(stats_data()).within(
+                    *origin(), radius
+                )
+                count = len(within)
+                volunteers = int(within["Volunteers"].sum())
+                return (
+                    f"{count} {'chapter' if count == 1 else 'chapters'},"
+                    f" {volunteers}"
+                    f" {'volunteer' if volunteers == 1 else 'volunteers'}"
+                    f" within {radius:,} km"
+                )
+
+            @render.data_frame
+            def nearby_table():
+                if origin() is None:
+                    return None
+                nearest = data.chapter_index(stats_data()).nearest(
+                    *origin(), input.nearby_k() or 5
+                )
+                return render.DataGrid(
+                    nearest[["Chapter", "Volunteers", "distance_km"]]
+                    .round({"distance_km": 0})
+                    .astype({"distance_km": int})
+                    .rename(columns={"distance_km": "Distance (km)"})
+                )
+
+        @render_maplibregl
+        def chapter_map():
+            # Chapters and theme changes are applied to the live map by
+            # follow_clusters and follow_theme below
+            with reactive.isolate():
+                mode = theme()
+
+            # Create the map
+            m = Map(
+                center=(20, 10),
+                zoom=1.5,
+                style=assets.basemap_style_url(mode),
+            )
+
+            # Add navigation control
+            m.add_control(
+                NavigationControl(
+                    show_compass=False,
+                    show_zoom=True,
+                    position="top-right",
+                    visualize_pitch=False,
+                )
+            )
+
+            # Add a source for the chapter clusters in view, filled in by
+            # follow_clusters, and circle layer for chapters
+            m.add_source(
+                "chapters",
+                {
+                    "type": "geojson",
+                    "data": {"type": "FeatureCollection", "features": []},
+                },
+            )
+            for layer in chapter_layers(mode):
+                m.add_layer(layer)
+
+            # Add popup on hover
+            m.add_tooltip("chapter-circles")
+
+            return m
+
+    maps.follow_clusters(
+        "chapter_map",
+        "chapters",
+        lambda: data.chapter_clusters(stats_data()),
+        input.chapter_map_view_state,
+    )
+    maps.follow_theme("chapter_map", theme, chapter_layers)
+
 
 with ui.card():
     ui.card_header("Languages Spoken by Volunteers")
 
     @render.text
     def english_language_text():
+        df_by_language = frames()["df_by_language"]
         english_volunteers = df_by_language.loc[
             df_by_language["Language"] == "English", "Volunteers"
         ].values
@@ -290,8 +339,10 @@ with ui.card():
 
     @render.text
     def single_language_text():
+        df_by_language = frames()["df_by_language"]
         single_volunteer_languages = (
-            df_by_language.loc[df_by_language["Volunteers"] == 1, "Language"]
+            df_by_language
+            .loc[df_by_language["Volunteers"] == 1, "Language"]
             .sort_values()
             .tolist()
         )
@@ -304,6 +355,7 @@ with ui.card():
 
     @render_altair
     def plot_language_alt():
+        df_by_language = frames()["df_by_language"]
         df_plot = df_by_language.loc[
             (df_by_language["Language"] != "English")
             & (df_by_language["Volunteers"] > 1),
@@ -311,7 +363,8 @@ with ui.card():
         ].sort_values("Volunteers", ascending=False)
 
         return (
-            alt.Chart(df_plot)
+            alt
+            .Chart(df_plot)
             .mark_bar()
             .encode(
                 x=alt.X("Volunteers:Q", title="Volunteers"),
@@ -323,3 +376,6 @@ with ui.card():
             .configure_view(strokeWidth=0)
             .configure_axis(grid=False, domain=False)
         )
+
+
+refresh.refresh_status("refresh", stats_data=stats_data)
@@ -1,11 +1,12 @@
-import json
 import random
 
 from maplibre import Map, MapContext, MapOptions, render_maplibregl
 from maplibre.controls import Marker, NavigationControl
 import pandas as pd
-import geopandas as gpd
-from shiny.express import ui
+from shiny import reactive
+from shiny.express import app_opts, input, ui
+
+from pyladies_dashboard import assets, countries, data, maps, tiles
 
 # Include custom CSS
 ui.tags.head(
@@ -19,13 +20,6 @@ ui.tags.head(
 """)
 )
 
-# Import Font Awesome
-ui.head_content(
-    ui.HTML("""
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    """)
-)
-
 # Donation data
 current_amount = 12450
 target_amount = 20000
@@ -83,37 +77,73 @@ print("Selected Countries and Frequencies:")
 for country, freq in country_data.items():
     print(f"{country}: {freq}")
 
-# Load world geometries from geopandas
-world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres"))
-
-# Filter for selected countries and add frequency data
-world["frequency"] = world["name"].map(country_data)
-world_filtered = world[world["name"].isin(selected_countries)].copy()
-
-# Create GeoJSON from filtered data
-# geojson_data = json.loads(world_filtered.to_json())
-
-# Create GeoJSON from filtered data with only the properties we want
-geojson_data = json.loads(
-    world_filtered[["name", "frequency", "geometry"]].to_json()
-)
+# Country outlines come from a vector tile archive built once per process
+# and served from /tiles; this session's random counts are applied on the
+# client through a match expression, so the tiles stay cacheable
+app_opts(static_assets=assets.static_assets())
+country_tiles_url = tiles.source_url(data.country_tiles())
+
+# Countries are matched on their ISO codes, whatever they are called here
+selected_codes = countries.iso_codes(pd.Series(selected_countries)).tolist()
+speakers_by_code = dict(zip(selected_codes, country_data.values()))
+
+# Overlay outlines take the page background color
+OUTLINE = {"light": "#ffffff", "dark": "#1d1f21"}
+
+# Fill color by number of speakers
+FILL_STOPS = [
+    0,
+    "#ffffcc",
+    25,
+    "#ffeda0",
+    50,
+    "#fed976",
+    75,
+    "#feb24c",
+    100,
+    "#f03b20",
+]
 
-# Rename properties to proper display names
-for feature in geojson_data["features"]:
-    country_name = feature["properties"]["name"]
-    frequency_value = country_data.get(country_name, 0)
 
-    # Replace properties with properly capitalized names
-    feature["properties"] = {
-        "Country": country_name,
-        "Speakers": frequency_value,
+# One fill layer per country, so each tooltip can carry its count, and
+# an outline layer
+def country_layers(theme):
+    fills = [
+        {
+            "id": f"country-fill-{code}",
+            "type": "fill",
+            "source": "countries",
+            "source-layer": "countries",
+            "filter": ["==", ["get", "ISO"], code],
+            "paint": {
+                "fill-color": ["interpolate", ["linear"], freq, *FILL_STOPS],
+                "fill-opacity": 0.7,
+            },
+        }
+        for code, freq in speakers_by_code.items()
+    ]
+    borders = {
+        "id": "country-borders",
+        "type": "line",
+        "source": "countries",
+        "source-layer": "countries",
+        "filter": ["in", ["get", "ISO"], ["literal", selected_codes]],
+        "paint": {"line-color": OUTLINE[theme], "line-width": 1},
     }
+    return [*fills, borders]
+
 
 # begin app -----
 
 # Page setup
 ui.page_opts(title="Community Conference Dashboard", fillable=True, id="page")
-ui.input_dark_mode()
+ui.input_dark_mode(id="dark_mode")
+
+
+@reactive.calc
+def theme():
+    # "light" or "dark", light until the browser has reported its mode
+    return input.dark_mode() if "dark_mode" in input else "light"
 
 
 # Create a layout with three value boxes side by side (above map)
@@ -167,10 +197,10 @@ with ui.layout_columns(col_widths=[4, 4, 4]):
     ui.value_box(
         title="Active Volunteers",
         value=f"{volunteer_count}",
-        showcase=ui.HTML("""
+        showcase=ui.HTML(f"""
             <div style="display: flex; align-items: center; justify-content: center;
                         height: 100%; padding: 10px;">
-                <i class="fas fa-users" style="font-size: 3em; color: rgba(255,255,255,0.9);"></i>
+                {assets.icon("users", "3em")}
             </div>
         """),
         theme="info",
@@ -189,56 +219,37 @@ with ui.card():
     # """)
     @render_maplibregl
     def mapgl():
+        # Theme changes are applied to the live map by follow_theme below
+        with reactive.isolate():
+            mode = theme()
+
         # Create the map
         m = Map(
             center=(0, 20),
             zoom=1.5,
-            style="https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
+            style=assets.basemap_style_url(mode),
         )
 
         # Add navigation control
         m.add_control(NavigationControl())
 
-        # Add GeoJSON source
-        m.add_source("countries", {"type": "geojson", "data": geojson_data})
+        # Add vector tile source
+        m.add_source("countries", {"type": "vector", "url": country_tiles_url})
 
-        # Add fill layer with color based on frequency
-        m.add_layer({
-            "id": "country-fills",
-            "type": "fill",
-            "source": "countries",
-            "paint": {
-                "fill-color": [
-                    "interpolate",
-                    ["linear"],
-                    ["get", "Speakers"],
-                    0,
-                    "#ffffcc",
-                    25,
-                    "#ffeda0",
-                    50,
-                    "#fed976",
-                    75,
-                    "#feb24c",
-                    100,
-                    "#f03b20",
-                ],
-                "fill-opacity": 0.7,
-            },
-        })
-
-        # Add outline layer
-        m.add_layer({
-            "id": "country-borders",
-            "type": "line",
-            "source": "countries",
-            "paint": {"line-color": "#ffffff", "line-width": 1},
-        })
+        # Add fill and outline layers
+        for layer in country_layers(mode):
+            m.add_layer(layer)
 
         # Add popup on hover
-        m.add_tooltip("country-fills")
+        for code, freq in speakers_by_code.items():
+            m.add_tooltip(
+                f"country-fill-{code}",
+                template=f"Country: {{{{ Country }}}}</br>Speakers: {freq}",
+            )
         return m
 
+    maps.follow_theme("mapgl", theme, country_layers)
+
 
 # Create a layout with four value boxes below the map
 with ui.layout_columns(col_widths=[3, 3, 3, 3]):
@@ -246,10 +257,10 @@ with ui.layout_columns(col_widths=[3, 3, 3, 3]):
     ui.value_box(
         title="Speakers",
         value=f"{speaker_count}",
-        showcase=ui.HTML("""
+        showcase=ui.HTML(f"""
             <div style="display: flex; align-items: center; justify-content: center;
                         height: 100%; padding: 10px;">
-                <i class="fas fa-microphone-lines" style="font-size: 2.5em; color: rgba(255,255,255,0.9);"></i>
+                {assets.icon("microphone-lines", "2.5em")}
             </div>
         """),
         theme="success",
@@ -259,10 +270,10 @@ with ui.layout_columns(col_widths=[3, 3, 3, 3]):
     ui.value_box(
         title="Countries",
         value=f"{country_count}",
-        showcase=ui.HTML("""
+        showcase=ui.HTML(f"""
             <div style="display: flex; align-items: center; justify-content: center;
                         height: 100%; padding: 10px;">
-                <i class="fas fa-earth-americas" style="font-size: 2.5em; color: rgba(255,255,255,0.9);"></i>
+                {assets.icon("earth-americas", "2.5em")}
             </div>
         """),
         theme="primary",
@@ -272,10 +283,10 @@ with ui.layout_columns(col_widths=[3, 3, 3, 3]):
     ui.value_box(
         title="Languages",
         value=f"{language_count}",
-        showcase=ui.HTML("""
+        showcase=ui.HTML(f"""
             <div style="display: flex; align-items: center; justify-content: center;
                         height: 100%; padding: 10px;">
-                <i class="fas fa-language" style="font-size: 2.5em; color: rgba(255,255,255,0.9);"></i>
+                {assets.icon("language", "2.5em")}
             </div>
         """),
         theme="info",
@@ -285,10 +296,10 @@ with ui.layout_columns(col_widths=[3, 3, 3, 3]):
     ui.value_box(
         title="Time Zones",
         value=f"{timezone_count}",
-        showcase=ui.HTML("""
+        showcase=ui.HTML(f"""
             <div style="display: flex; align-items: center; justify-content: center;
                         height: 100%; padding: 10px;">
-                <i class="fas fa-clock" style="font-size: 2.5em; color: rgba(255,255,255,0.9);"></i>
+                {assets.icon("clock", "2.5em")}
             </div>
         """),
         theme="warning",
@@ -0,0 +1,76 @@
+"""Time clustering chapters for the chapter map.
+
+``build`` clusters every chapter at every zoom level from scratch;
+``updated`` gets the same index from one built without the last 1% of
+the chapters, as when new stats add a few. Each view is then queried
+for its clusters, and the GeoJSON sent to the browser is measured
+against one feature per chapter.
+
+    python benchmarks/chapter_clusters.py [N ...]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard import pointclusters
+
+# (west, south, east, north, zoom)
+VIEWS = {
+    "world": (-200, -70, 240, 75, 1.5),
+    "europe": (-10, 35, 30, 60, 4),
+    "region": (-2, 50, 2, 53, 8),
+}
+
+
+def main(*sizes: int) -> None:
+    rng = np.random.default_rng(0)
+    for n in sizes or (1_000, 10_000, 100_000):
+        chapters = pd.DataFrame({
+            "Chapter": [f"Chapter {i}" for i in range(n)],
+            "Volunteers": rng.integers(1, 20, n),
+            "longitude": rng.uniform(-180, 180, n),
+            "latitude": rng.uniform(-60, 75, n),
+        })
+        start = time.perf_counter()
+        index = pointclusters.ClusterIndex(chapters)
+        build = time.perf_counter() - start
+        earlier = pointclusters.ClusterIndex(chapters.iloc[: n * 99 // 100])
+        start = time.perf_counter()
+        updated = earlier.updated(chapters)
+        update = time.perf_counter() - start
+        print(
+            f"{n:>7} chapters: build {build * 1000:.0f} ms, updated"
+            f" {update * 1000:.0f} ms"
+        )
+
+        per_chapter = len(
+            json.dumps(
+                pointclusters.feature_collection(
+                    index.clusters(-180, -85, 180, 85, index.max_zoom)
+                )
+            )
+        )
+        for name, view in VIEWS.items():
+            start = time.perf_counter()
+            clusters = updated.clusters(*view)
+            query = time.perf_counter() - start
+            expected = index.clusters(*view)
+            assert clusters["Volunteers"].sum() == expected["Volunteers"].sum()
+            assert sorted(clusters["chapters"]) == sorted(expected["chapters"])
+            size = len(json.dumps(pointclusters.feature_collection(clusters)))
+            print(
+                f"  {name:<6} {len(clusters):>4} clusters of"
+                f" {clusters['chapters'].sum():>6} chapters in"
+                f" {query * 1000:.1f} ms, {size / 1024:,.0f} kB of GeoJSON"
+                f" (all chapters: {per_chapter / 1024:,.0f} kB)"
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
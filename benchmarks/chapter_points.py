@@ -0,0 +1,88 @@
+"""Time the chapter point layer at event/member-location scale.
+
+Compares the old row-by-row GeoJSON FeatureCollection (``iterrows`` with
+``pd.notna`` checks, as chapter_map used to build on every render) with
+the columnar ``geometry.point_frame`` the chapter data is built from now.
+
+    python benchmarks/chapter_points.py [N ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard import geometry
+
+
+def synthetic_chapters(n: int, seed: int = 0) -> pd.DataFrame:
+    """``df_by_chapter_geocode``-shaped frame, 2% without coordinates"""
+    rng = np.random.default_rng(seed)
+    latitude = rng.uniform(-55, 70, n)
+    longitude = rng.uniform(-180, 180, n)
+    missing = rng.random(n) < 0.02
+    latitude[missing] = np.nan
+    longitude[missing] = np.nan
+    return pd.DataFrame({
+        "Chapter": [f"Chapter {i}" for i in range(n)],
+        "Volunteers": rng.integers(1, 50, n),
+        "country": rng.choice(["Nigeria", "Brazil", "Japan", "Spain"], n),
+        "latitude": latitude,
+        "longitude": longitude,
+    })
+
+
+def rowwise_geojson(df: pd.DataFrame) -> dict:
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {
+                    "Chapter": row["Chapter"],
+                    "Volunteers": row["Volunteers"],
+                    "Country": row["country"],
+                },
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [row["longitude"], row["latitude"]],
+                },
+            }
+            for _, row in df.iterrows()
+            if pd.notna(row["latitude"]) and pd.notna(row["longitude"])
+        ],
+    }
+
+
+def columnar_points(df: pd.DataFrame):
+    return geometry.point_frame(
+        df["longitude"],
+        df["latitude"],
+        {
+            "Chapter": df["Chapter"],
+            "Volunteers": df["Volunteers"],
+            "Country": df["country"],
+        },
+    )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'n':>8} {'iterrows':>10} {'columnar':>10}")
+    for n in sizes:
+        df = synthetic_chapters(n)
+        _, rowwise = timed(rowwise_geojson, df)
+        _, columnar = timed(columnar_points, df)
+        print(f"{n:>8} {rowwise:>9.3f}s {columnar:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10_000, 100_000])
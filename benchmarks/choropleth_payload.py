@@ -0,0 +1,89 @@
+"""Micro-benchmark the choropleth payload builders.
+
+``roundtrip`` is how the apps used to build a choropleth:
+``GeoDataFrame.to_json()``, ``json.loads`` and a Python loop that rewrote
+every feature's properties, then serialized again for the browser.
+``columnar`` is ``geometry.choropleth_frame`` plus
+``geometry.geojson_bytes``, which produce the same FeatureCollection
+directly.
+
+    python benchmarks/choropleth_payload.py [REPEAT]
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard import geometry
+
+
+def roundtrip(shapes, key, values, key_name, value_name) -> bytes:
+    shapes = shapes.copy()
+    shapes[value_name] = shapes[key].map(values)
+    shown = shapes[shapes[key].isin(list(values))].copy()
+    geojson_data = json.loads(shown[[key, value_name, "geometry"]].to_json())
+    for feature in geojson_data["features"]:
+        feature["properties"] = {
+            key_name: feature["properties"][key],
+            value_name: values.get(feature["properties"][key], 0),
+        }
+    return json.dumps(geojson_data).encode()
+
+
+def columnar(shapes, key, values, key_name, value_name) -> bytes:
+    return geometry.geojson_bytes(
+        geometry.choropleth_frame(shapes, key, values, key_name, value_name)
+    )
+
+
+def main(repeat: int = 20):
+    countries = geometry.choropleth_shapes(("name",))
+    continents = geometry.choropleth_shapes(("continent",), by="continent")
+    cases = {
+        "countries (all)": (
+            countries,
+            "name",
+            {name: i for i, name in enumerate(countries["name"])},
+            "Country",
+            "Speakers",
+        ),
+        "countries (10)": (
+            countries,
+            "name",
+            {name: i for i, name in enumerate(countries["name"][:10])},
+            "Country",
+            "Speakers",
+        ),
+        "continents": (
+            continents,
+            "continent",
+            {name: i for i, name in enumerate(continents["continent"])},
+            "Continent",
+            "Volunteers",
+        ),
+    }
+    print(f"{'case':<16} {'roundtrip':>10} {'columnar':>10} {'bytes':>8}")
+    for name, args in cases.items():
+        timings = []
+        for fn in (roundtrip, columnar):
+            best = min(
+                timeit.repeat(
+                    lambda fn=fn, args=args: fn(*args), number=1, repeat=repeat
+                )
+            )
+            timings.append(best * 1000)
+        expected = json.loads(roundtrip(*args))
+        # to_json() also writes the frame index as each feature's "id"
+        for feature in expected["features"]:
+            del feature["id"]
+        same = expected == json.loads(columnar(*args))
+        print(
+            f"{name:<16} {timings[0]:>8.2f}ms {timings[1]:>8.2f}ms "
+            f"{len(columnar(*args)):>8}{'' if same else '  (differs!)'}"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
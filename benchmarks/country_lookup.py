@@ -0,0 +1,65 @@
+"""Time assigning countries to coordinates.
+
+``per_point`` tests each point against every country polygon in turn,
+the obvious loop. ``countries_at`` is ``countries.countries_at``: one
+STRtree query over all points, plus a distance query for the points at
+sea when ``COAST_DISTANCE`` is given. Points are spread over the map,
+so most of them are at sea.
+
+    python benchmarks/country_lookup.py [N ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard import countries, geometry
+
+
+def per_point(lon, lat) -> list:
+    store = geometry.read_countries(("name",))
+    codes = countries.iso_codes(store["name"]).tolist()
+    polygons = store.geometry.tolist()
+    found = []
+    for x, y in zip(lon, lat):
+        point = shapely.Point(x, y)
+        found.append(
+            next(
+                (c for c, p in zip(codes, polygons) if p.intersects(point)),
+                None,
+            )
+        )
+    return found
+
+
+def main(*sizes: int) -> None:
+    rng = np.random.default_rng(0)
+    # build the tree before timing
+    countries.countries_at([0.0], [0.0])
+    for n in sizes or (1_000, 10_000, 100_000):
+        lon = rng.uniform(-180, 180, n)
+        lat = rng.uniform(-60, 75, n)
+        timings = {}
+        start = time.perf_counter()
+        inside = countries.countries_at(lon, lat)
+        timings["countries_at"] = time.perf_counter() - start
+        start = time.perf_counter()
+        countries.countries_at(lon, lat, countries.COAST_DISTANCE)
+        timings["+ coast"] = time.perf_counter() - start
+        if n <= 10_000:
+            start = time.perf_counter()
+            loop = per_point(lon, lat)
+            timings["per_point"] = time.perf_counter() - start
+            assert inside.tolist() == loop
+        print(
+            f"{n:>7} points, {inside.notna().mean():.0%} on land: "
+            + ", ".join(f"{k} {v * 1000:.1f} ms" for k, v in timings.items())
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,75 @@
+"""Time offline geocoding of chapter names with ``gazetteer.Gazetteer``.
+
+Each bundled place is looked up under its own name, without diacritics,
+with a typo and with a country suffix ("Lagos, Nigeria"), and the hits
+are checked against the place itself. A remote lookup takes a network
+round trip and a slot under the API's rate limit instead, ~200 ms at
+5 requests per second.
+
+    python benchmarks/gazetteer_lookup.py
+"""
+
+import random
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard.gazetteer import (
+    GAZETTEER_FILE,
+    Gazetteer,
+)
+
+
+def plain(name: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def typo(name: str, rng: random.Random) -> str:
+    """``name`` with one letter past the third dropped"""
+    if len(name) < 6:
+        return name
+    i = rng.randrange(3, len(name))
+    return name[:i] + name[i + 1 :]
+
+
+def main() -> None:
+    places = pd.read_csv(GAZETTEER_FILE, keep_default_na=False, na_values="")
+    start = time.perf_counter()
+    gazetteer = Gazetteer(places)
+    print(
+        f"{len(places)} places, {len(gazetteer.names)} names indexed in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    rng = random.Random(0)
+    variants = {
+        "exact": lambda row: row["name"],
+        "plain": lambda row: plain(row["name"]),
+        "typo": lambda row: typo(row["name"], rng),
+        "country": lambda row: f"{row['name']}, {row['country']}",
+    }
+    rows = places.dropna(subset=["country"]).to_dict("records")
+    for label, variant in variants.items():
+        queries = [(i, variant(row)) for i, row in enumerate(rows)]
+        start = time.perf_counter()
+        found = [(i, gazetteer.match(q)) for i, q in queries]
+        elapsed = time.perf_counter() - start
+        hits = sum(row is not None for _, row in found)
+        right = sum(
+            row is not None
+            and places.iloc[row][["latitude", "longitude"]].tolist()
+            == [rows[i]["latitude"], rows[i]["longitude"]]
+            for i, row in found
+        )
+        print(
+            f"{label:>8}: {elapsed / len(queries) * 1e6:6.1f} µs/lookup, "
+            f"{hits}/{len(queries)} found, {right} the same place"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Benchmark chapter geocoding against a local, rate-limited fake API.
+
+The fake server answers ``/search?q=...`` like geocode.maps.co, after a
+fixed latency, and enforces a limit of ``RATE`` requests per second by
+replying 429 with ``Retry-After``; a share of requests fail with 503.
+
+``sequential`` is how chapter_recode.py used to geocode: one
+``requests.get`` per chapter and a fixed sleep, treating any error as
+"not found". ``concurrent`` is ``geocode.Geocoder``. Both are checked
+against the answers the server should give, and any wrong answer from
+``concurrent`` fails the run. tests/test_geocode.py covers the rate limit
+and retries.
+
+    python benchmarks/geocode_throughput.py [QUERIES]
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard.geocode import Geocoder
+
+RATE = 5
+LATENCY = 0.2
+FAIL_EVERY = 10  # every n-th request gets a 503
+
+
+def expected(query: str) -> dict | None:
+    if query.startswith("Nowhere"):
+        return None
+    h = hashlib.sha256(query.encode()).digest()
+    return {
+        "latitude": h[0] / 255 * 180 - 90,
+        "longitude": h[1] / 255 * 360 - 180,
+        "country": f"Country {h[2] % 10}",
+    }
+
+
+class FakeAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.lock = threading.Lock()
+        # the server's allowance: RATE per second, in bursts of up to RATE
+        self.tokens = RATE
+        self.updated = time.monotonic()
+        self.counts = {"requests": 0, "429": 0, "503": 0}
+
+    def admit(self) -> int:
+        with self.lock:
+            self.counts["requests"] += 1
+            now = time.monotonic()
+            self.tokens = min(RATE, self.tokens + (now - self.updated) * RATE)
+            self.updated = now
+            if self.tokens < 1:
+                self.counts["429"] += 1
+                return 429
+            self.tokens -= 1
+            if self.counts["requests"] % FAIL_EVERY == 0:
+                self.counts["503"] += 1
+                return 503
+            return 200
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        status = self.server.admit()
+        body = b"[]"
+        if status == 200:
+            query = parse_qs(urlparse(self.path).query)["q"][0]
+            result = expected(query)
+            if result:
+                body = json.dumps([
+                    {
+                        "lat": str(result["latitude"]),
+                        "lon": str(result["longitude"]),
+                        "display_name": f"{query}, {result['country']}",
+                    }
+                ]).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def lookup_once(url: str, query: str) -> dict | None:
+    """One lookup as chapter_recode.py did it, any error being None"""
+    try:
+        response = requests.get(url, params={"q": query})
+        data = response.json() if response.status_code == 200 else None
+    except requests.RequestException:
+        return None
+    if not data:
+        return None
+    return {
+        "latitude": float(data[0]["lat"]),
+        "longitude": float(data[0]["lon"]),
+        "country": data[0]["display_name"].split(", ")[-1],
+    }
+
+
+def sequential(url: str, queries: list[str]) -> dict:
+    results = {}
+    for query in queries:
+        results[query] = lookup_once(url, query)
+        time.sleep(0.21)
+    return results
+
+
+def concurrent(url: str, queries: list[str]) -> dict:
+    geocoder = Geocoder(url=url, rate=RATE)
+    return {
+        lookup.query: lookup.result
+        for lookup in geocoder.geocode_many(queries)
+    }
+
+
+def main(n: int = 40) -> None:
+    queries = [f"Chapter {i}" for i in range(n - n // 10)]
+    queries += [f"Nowhere {i}" for i in range(n // 10)]
+    print(
+        f"{n} queries, limit {RATE}/s, {LATENCY * 1000:.0f} ms latency, "
+        f"1 in {FAIL_EVERY} requests fails"
+    )
+    for fn in (sequential, concurrent):
+        server = FakeAPI()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_port}/search"
+        start = time.perf_counter()
+        results = fn(url, queries)
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        wrong = sum(results.get(q) != expected(q) for q in queries)
+        print(
+            f"{fn.__name__:>10}: {elapsed:6.2f} s, "
+            f"{n / elapsed:4.1f} lookups/s, "
+            f"{server.counts['requests']} requests, "
+            f"{server.counts['429']} rate limited, "
+            f"{server.counts['503']} failed, {wrong} wrong results"
+        )
+        # the old loop drops answers on errors; the geocoder must not
+        assert fn is sequential or not wrong, f"{fn.__name__}: wrong results"
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
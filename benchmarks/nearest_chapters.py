@@ -0,0 +1,93 @@
+"""Time nearest-chapter lookups.
+
+``haversine`` computes the distance from the query point to every
+chapter and sorts, the obvious approach. ``ChapterIndex`` is
+``nearby.ChapterIndex``: a KD-tree over the chapters as unit vectors,
+built once, then queried for positions (``nearest_ids``, ``within_ids``)
+or for the chapters' rows (``nearest``, ``within``). Chapters are
+spread over the land latitudes; each size runs 200 queries at random
+points.
+
+    python benchmarks/nearest_chapters.py [N ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pyladies_dashboard import nearby
+
+QUERIES = 200
+K = 5
+RADIUS_KM = 500
+
+
+def haversine(lon, lat, lon0, lat0) -> np.ndarray:
+    lon, lat, lon0, lat0 = map(np.radians, (lon, lat, lon0, lat0))
+    a = (
+        np.sin((lat - lat0) / 2) ** 2
+        + np.cos(lat) * np.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    )
+    return 2 * nearby.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def main(*sizes: int) -> None:
+    rng = np.random.default_rng(0)
+    for n in sizes or (1_000, 10_000, 100_000):
+        lon = rng.uniform(-180, 180, n)
+        lat = rng.uniform(-60, 75, n)
+        chapters = pd.DataFrame({
+            "Chapter": [f"Chapter {i}" for i in range(n)],
+            "longitude": lon,
+            "latitude": lat,
+        })
+        queries = zip(
+            rng.uniform(-180, 180, QUERIES), rng.uniform(-60, 75, QUERIES)
+        )
+        start = time.perf_counter()
+        index = nearby.ChapterIndex(chapters)
+        build = time.perf_counter() - start
+        timings = dict.fromkeys(
+            ["haversine", "nearest_ids", "within_ids", "nearest", "within"],
+            0.0,
+        )
+        for lon0, lat0 in queries:
+            start = time.perf_counter()
+            distance = haversine(lon, lat, lon0, lat0)
+            order = np.argsort(distance)
+            brute_nearest = order[:K]
+            brute_within = np.flatnonzero(distance <= RADIUS_KM)
+            timings["haversine"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            ids, km = index.nearest_ids(lon0, lat0, K)
+            timings["nearest_ids"] += time.perf_counter() - start
+            start = time.perf_counter()
+            index.within_ids(lon0, lat0, RADIUS_KM)
+            timings["within_ids"] += time.perf_counter() - start
+            start = time.perf_counter()
+            nearest = index.nearest(lon0, lat0, K)
+            timings["nearest"] += time.perf_counter() - start
+            start = time.perf_counter()
+            within = index.within(lon0, lat0, RADIUS_KM)
+            timings["within"] += time.perf_counter() - start
+
+            assert ids.tolist() == brute_nearest.tolist()
+            assert nearest.index.tolist() == brute_nearest.tolist()
+            np.testing.assert_allclose(km, distance[brute_nearest], atol=1e-6)
+            assert sorted(within.index) == brute_within.tolist()
+        print(
+            f"{n:>7} chapters, index built in {build * 1000:.1f} ms;"
+            " per query: "
+            + ", ".join(
+                f"{k} {v / QUERIES * 1e6:.0f} µs" for k, v in timings.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
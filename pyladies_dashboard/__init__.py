@@ -0,0 +1 @@
+"""Shared code for the PyLadies global dashboards."""
@@ -0,0 +1,146 @@
+"""Self-hosted static assets: basemap style and icons.
+
+Nothing on first paint comes from a third-party CDN. The basemap is a
+small maplibre style drawn from the bundled country tiles (see
+``tiles.py``), written under a content-hashed name to ``ASSETS_DIR``, and
+icons are inlined as SVG from the ``faicons`` package, so a page carries
+only the handful of Font Awesome glyphs it actually uses.
+
+Register both static directories in an Express app with::
+
+    app_opts(static_assets=assets.static_assets())
+
+Because every file name carries a hash of its content, a URL never
+changes meaning; see ``static.py`` for how the files are cached.
+"""
+
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import faicons
+
+from . import data, static, tiles
+
+ASSETS_DIR = Path(
+    os.getenv(
+        "PYLADIES_ASSETS_DIR",
+        Path(__file__).resolve().parent.parent / ".cache" / "assets",
+    )
+)
+ASSETS_ROUTE = "/assets"
+
+# Close to CARTO Positron, which the maps used before
+BASEMAP_COLORS = {
+    "water": "#d4dadc",
+    "land": "#fafaf8",
+    "border": "#c9c9c9",
+}
+# Close to CARTO Dark Matter, around Shiny's dark page background
+BASEMAP_DARK_COLORS = {
+    "water": "#15171a",
+    "land": "#2b2e33",
+    "border": "#4a4f57",
+}
+# By page color mode, as reported by ui.input_dark_mode()
+BASEMAP_THEMES = {"light": BASEMAP_COLORS, "dark": BASEMAP_DARK_COLORS}
+
+
+def static_assets() -> dict[str, Path]:
+    """The static routes and their directories, created if missing"""
+    routes = {tiles.TILES_ROUTE: tiles.TILES_DIR, ASSETS_ROUTE: ASSETS_DIR}
+    for directory in routes.values():
+        # Shiny serves a path that isn't a directory as a single file
+        directory.mkdir(parents=True, exist_ok=True)
+    return routes
+
+
+def publish(name: str, suffix: str, content: bytes) -> str:
+    """Write ``content`` to ASSETS_DIR under a content-hashed name.
+
+    Returns the asset's URL relative to the page; identical content is
+    written once.
+    """
+    filename = static.publish(
+        ASSETS_DIR,
+        name,
+        suffix,
+        hashlib.sha256(content).hexdigest(),
+        lambda tmp: tmp.write_bytes(content),
+    )
+    return f"{ASSETS_ROUTE.lstrip('/')}/{filename}"
+
+
+def basemap_paint(colors: dict[str, str] = BASEMAP_COLORS) -> dict:
+    """Paint properties of the basemap layers, by layer id"""
+    return {
+        "water": {"background-color": colors["water"]},
+        "land": {"fill-color": colors["land"]},
+        "borders": {"line-color": colors["border"], "line-width": 0.5},
+    }
+
+
+def basemap_style(colors: dict[str, str] = BASEMAP_COLORS) -> dict:
+    """maplibre style with land and borders from the country tiles"""
+    source = {
+        "type": "vector",
+        "url": tiles.source_url(data.country_tiles()),
+    }
+    paint = basemap_paint(colors)
+    return {
+        "version": 8,
+        "name": "PyLadies basemap",
+        "sources": {"basemap": source},
+        "layers": [
+            {
+                "id": "water",
+                "type": "background",
+                "paint": paint["water"],
+            },
+            {
+                "id": "land",
+                "type": "fill",
+                "source": "basemap",
+                "source-layer": "countries",
+                "paint": paint["land"],
+            },
+            {
+                "id": "borders",
+                "type": "line",
+                "source": "basemap",
+                "source-layer": "countries",
+                "paint": paint["borders"],
+            },
+        ],
+    }
+
+
+@functools.cache
+def basemap_style_url(theme: str = "light") -> str:
+    """URL of the published basemap style, for ``Map(style=...)``
+
+    Both themes share layer ids, so a live map switches between them with
+    ``basemap_paint()`` alone (see ``maps.follow_theme``).
+    """
+    style = basemap_style(BASEMAP_THEMES[theme])
+    content = json.dumps(style, separators=(",", ":")).encode()
+    return publish(f"basemap-{theme}", ".json", content)
+
+
+def icon(name: str, size: str | None = None) -> str:
+    """Inline SVG markup for the Font Awesome icon ``name`` (no ``fa-``)
+
+    Without ``size`` the icon takes the value box showcase's icon size.
+    """
+    svg = faicons.icon_svg(
+        name,
+        fill="rgba(255,255,255,0.9)",
+        height="1em",
+        margin_left="0",
+        margin_right="0",
+    )
+    if size:
+        svg.add_style(f"font-size:{size};")
+    return str(svg)
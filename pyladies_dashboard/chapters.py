@@ -0,0 +1,138 @@
+"""Canonical chapter names, so spelling variants count as one chapter.
+
+Chapter names are typed in by hand, and "NYC", "New York City" and
+"PyLadies NYC" are the same chapter. ``canonical_form`` folds a name,
+drops the "PyLadies" prefix and expands common abbreviations.
+``alias_table`` then clusters names whose canonical forms are at least
+``MIN_SIMILARITY`` alike by trigram similarity and differ only by typos,
+not by a word ("Portland" and "Portland OR" stay apart): the chapter
+with the most volunteers leads, and takes into its cluster every name
+still unassigned that is close to its own. Each cluster is keyed by the
+leader's canonical form and shown under the leader's name.
+
+chapter_recode.py geocodes each cluster by the leader's
+``expanded_name`` ("Kuala Lumpur" for "PyLadies KL") and writes the
+table to ``CHAPTER_ALIASES_CSV``; the dashboards merge chapters on
+``chapter_key``.
+"""
+
+import difflib
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .names import TrigramIndex, fold
+
+CHAPTER_ALIASES_CSV = (
+    Path(__file__).resolve().parent.parent
+    / "app-volunteer"
+    / "chapter_aliases.csv"
+)
+
+# Trigram similarity (Dice coefficient) of two names of the same chapter
+MIN_SIMILARITY = 0.75
+# difflib ratio of a misspelled word to the word
+MIN_WORD_SIMILARITY = 0.75
+
+ABBREVIATIONS = {
+    "cdmx": "mexico city",
+    "dc": "washington dc",
+    "kl": "kuala lumpur",
+    "nyc": "new york city",
+    "sf": "san francisco",
+}
+_FILLER = {"pyladies", "chapter"}
+_PYLADIES = re.compile(r"\bpy\W*ladies\b", re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+_SPACE_BEFORE = re.compile(r"\s+([,)])")
+
+
+def expanded_name(name: str) -> str:
+    """``name`` without "PyLadies" and with abbreviations expanded, its
+    punctuation kept: what the geocoder looks up.
+
+    An expansion adds only the words the name lacks: "Washington DC"
+    stays as it is, and "DC" becomes "Washington DC".
+    """
+    plain = _PYLADIES.sub(" ", name)
+    words = set(fold(plain).split())
+
+    def expand(match: re.Match) -> str:
+        word = fold(match.group())
+        if word in _FILLER:
+            return ""
+        expansion = ABBREVIATIONS.get(word, word).split()
+        return " ".join(
+            match.group() if w == word else w.title()
+            for w in expansion
+            if w == word or w not in words
+        )
+
+    expanded = " ".join(_WORD.sub(expand, plain).split())
+    expanded = _SPACE_BEFORE.sub(r"\1", expanded).strip(" ,/-")
+    return expanded if fold(expanded) else name.strip()
+
+
+def canonical_form(name: str) -> str:
+    """``expanded_name`` folded: "washington dc" for "PyLadies DC" """
+    return fold(expanded_name(name))
+
+
+def _same_words(a: str, b: str) -> bool:
+    """Whether canonical forms ``a`` and ``b`` differ at most by typos:
+    the words only one has pair up, in order, as misspellings of each
+    other. "cambridge ma" and "cambridge" differ by a word.
+    """
+    words_a, words_b = a.split(), b.split()
+    only_a = [w for w in words_a if w not in words_b]
+    only_b = [w for w in words_b if w not in words_a]
+    return len(only_a) == len(only_b) and all(
+        difflib.SequenceMatcher(None, x, y).ratio() >= MIN_WORD_SIMILARITY
+        for x, y in zip(only_a, only_b)
+    )
+
+
+def alias_table(
+    chapters: pd.Series,
+    volunteers: pd.Series | None = None,
+    min_similarity: float = MIN_SIMILARITY,
+) -> pd.DataFrame:
+    """Each distinct name in ``chapters`` with its cluster's ``chapter_key``
+    and ``canonical`` name, leaders chosen by total ``volunteers``
+    """
+    names = pd.DataFrame({
+        "chapter": np.asarray(chapters),
+        "volunteers": 1 if volunteers is None else np.asarray(volunteers),
+    })
+    names = names.groupby("chapter", as_index=False)["volunteers"].sum()
+    # ties go by name, so keys don't change from run to run
+    names = names.sort_values(
+        ["volunteers", "chapter"], ascending=[False, True], ignore_index=True
+    )
+    forms = names["chapter"].map(canonical_form).to_numpy()
+    index = TrigramIndex(forms)
+    leader = np.full(len(names), -1)
+    for i, form in enumerate(forms):
+        if leader[i] >= 0:
+            continue
+        ids, score = index.scores(form)
+        ids = ids[(score >= min_similarity) & (leader[ids] < 0)]
+        ids = [j for j in ids if _same_words(form, forms[j])]
+        leader[ids] = i
+        leader[i] = i
+    aliases = pd.DataFrame({
+        "chapter": names["chapter"],
+        "chapter_key": forms[leader],
+        "canonical": names["chapter"].to_numpy()[leader],
+    })
+    return aliases.sort_values("chapter", ignore_index=True)
+
+
+def chapter_keys(chapters: pd.Series, aliases: pd.DataFrame) -> pd.Series:
+    """``chapter_key`` of each of ``chapters``, by ``aliases`` or, for
+    names it doesn't list yet, by their own canonical form
+    """
+    keys = chapters.map(aliases.set_index("chapter")["chapter_key"])
+    return keys.fillna(chapters.map(canonical_form))
@@ -0,0 +1,254 @@
+"""Country and continent names, normalized through one alias index.
+
+Countries come from the bundled geometry store (name, ISO 3166-1 alpha-3
+code and continent), plus ``EXTRA_COUNTRIES`` too small for its 1:110m
+scale. Every country is indexed under its store name, display name, ISO
+code and ``ALIASES``, all folded with ``names.fold``. A name resolves
+exactly first, then by each part of a split name ("Suomi / Finland"),
+then by trigram similarity of at least ``MIN_SIMILARITY``, ties going to
+the first ISO code in order. "Niger" and "Nigeria" are both exact.
+
+The functions take and return ``pd.Series``; each distinct value is
+resolved once. Names that don't resolve come back as NaN.
+
+``countries_at`` places coordinates instead, in the store's polygons
+through an STRtree built once per process: a single vectorized query
+covers thousands of points in milliseconds.
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from . import geometry
+from .names import TrigramIndex, fold, name_parts
+
+# Trigram similarity (Dice coefficient) a fuzzy match needs
+MIN_SIMILARITY = 0.8
+
+# Distance (degrees) from a country within which a point at sea is taken
+# to be in it: 1:110m outlines cut off many coastal cities
+COAST_DISTANCE = 0.5
+
+# Countries missing from the 1:110m geometry: (name, ISO code, continent)
+EXTRA_COUNTRIES = [
+    ("Bahrain", "BHR", "Asia"),
+    ("Barbados", "BRB", "North America"),
+    ("Hong Kong", "HKG", "Asia"),
+    ("Maldives", "MDV", "Asia"),
+    ("Malta", "MLT", "Europe"),
+    ("Mauritius", "MUS", "Africa"),
+    ("Singapore", "SGP", "Asia"),
+]
+
+# Names to show instead of the abbreviated ones in the geometry store
+DISPLAY_NAMES = {
+    "BIH": "Bosnia and Herzegovina",
+    "CAF": "Central African Republic",
+    "COD": "Democratic Republic of the Congo",
+    "DOM": "Dominican Republic",
+    "GNQ": "Equatorial Guinea",
+    "SLB": "Solomon Islands",
+    "SSD": "South Sudan",
+    "SWZ": "Eswatini",
+    "USA": "United States",
+}
+
+# Other names for countries, by ISO code
+ALIASES = {
+    "AUT": ["Österreich"],
+    "BRA": ["Brasil"],
+    "CHE": ["Schweiz", "Suisse", "Svizzera"],
+    "CHN": ["中国", "PRC"],
+    "CIV": ["Côte d'Ivoire", "Ivory Coast"],
+    "COL": ["Columbia"],
+    "COD": ["DR Congo", "DRC", "Congo-Kinshasa"],
+    "COG": ["Congo-Brazzaville", "Republic of the Congo"],
+    "CZE": ["Czech Republic", "Česko"],
+    "DEU": ["Deutschland"],
+    "DNK": ["Danmark"],
+    "ESP": ["España"],
+    "FIN": ["Suomi"],
+    "GBR": ["UK", "Great Britain", "England", "Scotland", "Wales"],
+    "IRL": ["Éire"],
+    "ITA": ["Italia"],
+    "JPN": ["日本"],
+    "KOR": ["South Korea", "Korea", "Republic of Korea", "대한민국"],
+    "MEX": ["México"],
+    "MOZ": ["Moçambique"],
+    "NLD": ["Nederland", "Holland", "The Netherlands"],
+    "NOR": ["Norge"],
+    "PER": ["Perú"],
+    "PHL": ["Pilipinas", "Phillipines"],
+    "POL": ["Polska"],
+    "RUS": ["Russian Federation"],
+    "SWE": ["Sverige"],
+    "SWZ": ["Swaziland"],
+    "THA": ["ประเทศไทย"],
+    "TUR": ["Türkiye"],
+    "TWN": ["臺灣", "台灣"],
+    "USA": ["USA", "US", "U.S.", "U.S.A.", "United States of America"],
+    "VNM": ["Viet Nam", "Việt Nam"],
+}
+
+# The store has no code for Kosovo; XKX is the one in common use
+_CODE_FIXES = {"Kosovo": "XKX"}
+
+CONTINENTS = [
+    "Africa",
+    "Antarctica",
+    "Asia",
+    "Europe",
+    "North America",
+    "Oceania",
+    "South America",
+]
+CONTINENT_ALIASES = {
+    "Australia": "Oceania",
+    "Australasia": "Oceania",
+    "Central America": "North America",
+    "Caribbean": "North America",
+    "Latin America": "South America",
+}
+
+
+class _Index:
+    """Folded names to values, matched exactly, by part, then fuzzily"""
+
+    def __init__(self, entries: dict[str, str], min_similarity: float):
+        self.exact = entries
+        self.keys = list(entries)
+        self.values = np.array(list(entries.values()))
+        self.trigrams = TrigramIndex(self.keys)
+        self.min_similarity = min_similarity
+
+    def resolve(self, name) -> str | None:
+        if not isinstance(name, str):
+            return None
+        parts = name_parts(name)
+        for part in parts:
+            if part in self.exact:
+                return self.exact[part]
+        # the most similar name, ties going to the first value in order
+        candidates = []
+        for part in parts:
+            ids, score = self.trigrams.scores(part)
+            close = score >= self.min_similarity
+            candidates += zip(-score[close], self.values[ids[close]])
+        return str(min(candidates)[1]) if candidates else None
+
+    def map(self, names: pd.Series) -> pd.Series:
+        resolved = {name: self.resolve(name) for name in names.unique()}
+        return names.map(resolved)
+
+
+@functools.cache
+def country_table() -> pd.DataFrame:
+    """One row per country: ``name`` to show, ``iso_a3``, ``continent``"""
+    store = geometry.read_countries(("name", "iso_a3", "continent"))
+    table = pd.concat(
+        [
+            pd.DataFrame(store.drop(columns="geometry")),
+            pd.DataFrame(
+                EXTRA_COUNTRIES, columns=["name", "iso_a3", "continent"]
+            ),
+        ],
+        ignore_index=True,
+    )
+    table["iso_a3"] = table["name"].map(_CODE_FIXES).fillna(table["iso_a3"])
+    table["store_name"] = table["name"]
+    table["name"] = table["iso_a3"].map(DISPLAY_NAMES).fillna(table["name"])
+    table = table.drop_duplicates("iso_a3")
+    return table.set_index("iso_a3").sort_index()
+
+
+@functools.cache
+def _country_index() -> _Index:
+    table = country_table()
+    entries = {}
+    for code, row in table.iterrows():
+        for name in [code, row["name"], row["store_name"]]:
+            entries.setdefault(fold(name), code)
+    for code, names in ALIASES.items():
+        for name in names:
+            entries.setdefault(fold(name), code)
+    return _Index(entries, MIN_SIMILARITY)
+
+
+@functools.cache
+def _continent_index() -> _Index:
+    entries = {fold(c): c for c in CONTINENTS}
+    for alias, continent in CONTINENT_ALIASES.items():
+        entries[fold(alias)] = continent
+    return _Index(entries, MIN_SIMILARITY)
+
+
+def iso_codes(names: pd.Series) -> pd.Series:
+    """ISO 3166-1 alpha-3 code of each country in ``names``"""
+    return _country_index().map(names)
+
+
+def is_region(name: str) -> bool:
+    """Whether ``name`` is, as a whole, a country's name or code or a
+    continent's name
+    """
+    folded = fold(name)
+    return folded in _country_index().exact or folded in (
+        _continent_index().exact
+    )
+
+
+def country_names(names: pd.Series) -> pd.Series:
+    """English name of each country in ``names``, one per country"""
+    return iso_codes(names).map(country_table()["name"])
+
+
+def continents(names: pd.Series) -> pd.Series:
+    """Continent of each country in ``names``"""
+    return iso_codes(names).map(country_table()["continent"])
+
+
+def continent_names(names: pd.Series) -> pd.Series:
+    """Each of ``names`` as one of ``CONTINENTS``"""
+    return _continent_index().map(names)
+
+
+@functools.cache
+def _country_tree() -> tuple[shapely.STRtree, np.ndarray]:
+    store = geometry.read_countries(("name",))
+    codes = iso_codes(store["name"]).to_numpy()
+    return shapely.STRtree(store.geometry.to_numpy()), codes
+
+
+def countries_at(longitude, latitude, max_distance: float = 0.0) -> pd.Series:
+    """ISO code of the country each point is in; NaN for points at sea or
+    without coordinates.
+
+    Points within ``max_distance`` degrees of a country but in none take
+    the nearest one. A Series ``longitude`` lends the result its index.
+    """
+    lon = np.asarray(longitude, dtype=float)
+    lat = np.asarray(latitude, dtype=float)
+    tree, codes = _country_tree()
+    points = shapely.points(lon, lat)
+    found = np.full(len(points), None, dtype=object)
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    hit, polygon = tree.query(points[valid], predicate="intersects")
+    found[valid[hit]] = codes[polygon]
+    if max_distance > 0:
+        missing = valid[pd.isna(found[valid])]
+        hit, polygon = tree.query(
+            points[missing], predicate="dwithin", distance=max_distance
+        )
+        distance = shapely.distance(
+            points[missing[hit]], tree.geometries[polygon]
+        )
+        # the nearest of the polygons around each point
+        order = np.lexsort((distance, hit))
+        _, first = np.unique(hit[order], return_index=True)
+        nearest = order[first]
+        found[missing[hit[nearest]]] = codes[polygon[nearest]]
+    index = longitude.index if isinstance(longitude, pd.Series) else None
+    return pd.Series(found, index=index)
@@ -0,0 +1,426 @@
+"""Process-wide data layer shared by the dashboards.
+
+Shiny Express runs an app file again for every new session, so anything
+expensive (downloading stats.json, building the choropleth from the
+country geometry and merging the geocoded chapter CSV) lives here
+instead. Each piece is loaded once per process and reused. The stats are
+kept fresh by the scheduler in ``pyladies_dashboard.refresh``; a new
+process starts from the last good snapshot on disk
+(``pyladies_dashboard.snapshot``) and revalidates it in the background, as
+it also does if the stats are ever older than ``STATS_TTL`` seconds.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+
+from . import (
+    chapters,
+    countries,
+    geometry,
+    nearby,
+    pointclusters,
+    snapshot,
+    tiles,
+)
+from .portal import stats_client
+
+logger = logging.getLogger(__name__)
+
+STATS_TTL = float(os.getenv("PYLADIES_STATS_TTL", "900"))
+
+CHAPTER_CSV = (
+    Path(__file__).resolve().parent.parent
+    / "app-volunteer"
+    / "chapter_geocoded.csv"
+)
+
+
+@dataclass(eq=False)
+class StatsData:
+    """One downloaded copy of stats.json.
+
+    Instances hash by identity, so the derived frames below can be cached
+    per data version with ``functools.lru_cache``.
+    """
+
+    payload: dict
+    version: str
+    fetched_at: float
+
+    @property
+    def stats(self) -> dict:
+        return self.payload["stats"]
+
+
+_lock = threading.Lock()
+_current: StatsData | None = None
+_revalidating = threading.Event()
+
+# Why the most recent refresh failed, cleared by the next success
+last_error: str | None = None
+
+
+def _stats_data(content: bytes, fetched_at: float) -> StatsData:
+    return StatsData(
+        payload=json.loads(content),
+        version=hashlib.sha256(content).hexdigest()[:12],
+        fetched_at=fetched_at,
+    )
+
+
+def fetch_stats() -> StatsData:
+    """Download stats.json through the shared portal client.
+
+    Successful fetches are also saved as the on-disk snapshot.
+    """
+    response = stats_client.fetch()
+    fetched_at = time.time()
+    if response.not_modified:
+        snapshot.touch_snapshot(fetched_at)
+    else:
+        snapshot.write_snapshot(response.content, fetched_at)
+    return _stats_data(response.content, fetched_at)
+
+
+def _swap(fresh: StatsData) -> StatsData:
+    # Callers hold _lock. When the payload is byte-for-byte the same
+    # (including a 304 from the portal), the existing object is kept and
+    # only its timestamp moves, so everything derived from it stays cached.
+    global _current
+    if _current is not None and fresh.version == _current.version:
+        _current.fetched_at = fresh.fetched_at
+    else:
+        _current = fresh
+    return _current
+
+
+def _revalidate() -> None:
+    try:
+        refresh_stats()
+    except Exception as e:
+        logger.warning("Revalidating the stats snapshot failed: %s", e)
+    finally:
+        _revalidating.clear()
+
+
+def _revalidate_in_background() -> None:
+    if not _revalidating.is_set():
+        _revalidating.set()
+        threading.Thread(
+            target=_revalidate, name="stats-revalidate", daemon=True
+        ).start()
+
+
+def get_stats_data() -> StatsData:
+    """Return the cached stats without waiting on the portal when possible.
+
+    A fresh process starts from the on-disk snapshot and revalidates it in
+    the background; only when there is no snapshot does the first call
+    block on a fetch. Stats older than the TTL are served as-is while a
+    background revalidation runs (stale-while-revalidate).
+    """
+    global _current
+    with _lock:
+        if _current is None:
+            saved = snapshot.read_snapshot()
+            if saved is None:
+                return _swap(fetch_stats())
+            _current = _stats_data(*saved)
+            _revalidate_in_background()
+        elif staleness() > STATS_TTL:
+            _revalidate_in_background()
+        return _current
+
+
+def refresh_stats() -> StatsData:
+    """Fetch the stats now and atomically swap them in"""
+    global last_error
+    try:
+        fresh = fetch_stats()
+    except Exception as e:
+        last_error = str(e)
+        raise
+    last_error = None
+    with _lock:
+        return _swap(fresh)
+
+
+def current_version() -> str:
+    """Version of the cached stats, without ever fetching.
+
+    Cheap enough to be polled by every session.
+    """
+    return _current.version if _current is not None else ""
+
+
+def staleness() -> float:
+    """Seconds since the portal last confirmed the cached stats"""
+    if _current is None:
+        return float("inf")
+    return time.time() - _current.fetched_at
+
+
+# sponsor dashboard -----
+
+
+@functools.lru_cache(maxsize=2)
+def sponsor_totals(data: StatsData) -> dict:
+    """Headline numbers shown in the sponsor dashboard's value boxes"""
+    stats = data.stats
+    sponsorship_paid = float(stats["sponsorship_paid_amount"])
+    sponsorship_committed = float(stats["sponsorship_committed_amount"])
+    goal = stats["sponsorship_goal"]
+    return {
+        "num_sponsors_committed": stats["sponsorship_committed_count"],
+        "num_sponsors_contacted": stats["sponsorship_total_count"],
+        "sponsorship_paid": sponsorship_paid,
+        "sponsorship_paid_num": stats["sponsorship_paid_count"],
+        "sponsorship_pending": float(stats["sponsorship_pending_amount"]),
+        "sponsorship_pending_num": stats["sponsorship_pending_count"],
+        "sponsorship_committed": sponsorship_committed,
+        "sponsorship_paid_pct": sponsorship_paid / sponsorship_committed * 100,
+        "goal": goal,
+        "goal_pct": sponsorship_paid / goal,
+    }
+
+
+@functools.lru_cache(maxsize=2)
+def sponsor_frames(data: StatsData) -> dict[str, pd.DataFrame]:
+    """Frames plotted by the sponsor dashboard"""
+    stats = data.stats
+    goal = stats["sponsorship_goal"]
+    sponsorship_paid = float(stats["sponsorship_paid_amount"])
+    sponsorship_committed = float(stats["sponsorship_committed_amount"])
+
+    sponsor_status = pd.DataFrame(
+        stats["sponsorship_breakdown"][0]["data"], columns=["status", "count"]
+    )
+    sponsor_status = sponsor_status.assign(
+        status=sponsor_status["status"].str.title().str.replace(" ", "\n")
+    )
+    sponsor_status["percent"] = (
+        sponsor_status["count"] / sponsor_status["count"].sum() * 100
+    )
+
+    sponsor_tier = pd.DataFrame(
+        stats["sponsorship_breakdown"][1]["data"], columns=["tier", "count"]
+    )
+    sponsor_tier["percent"] = (
+        sponsor_tier["count"] / sponsor_tier["count"].sum() * 100
+    )
+    sponsor_tier = sponsor_tier.assign(
+        tier=sponsor_tier["tier"].str.title().str.replace(" ", "\n")
+    )
+
+    funding_goal = pd.DataFrame({
+        "segment": ["goal", "stretch"],
+        "amount": [
+            int(goal),
+            int(sponsorship_committed - goal),
+        ],
+    })
+    # Make segment an ordered categorical so stacking is correct
+    funding_goal["segment"] = pd.Categorical(
+        funding_goal["segment"],
+        categories=["stretch", "goal"],
+        ordered=True,
+    )
+
+    paid_funding = pd.DataFrame({
+        "segment": ["paid", "total"],
+        "amount": [
+            sponsorship_paid,
+            sponsorship_committed - sponsorship_paid,
+        ],
+    })
+    # Make segment an ordered categorical so stacking is correct
+    paid_funding["segment"] = pd.Categorical(
+        paid_funding["segment"],
+        categories=["total", "paid"],
+        ordered=True,
+    )
+
+    return {
+        "sponsor_status": sponsor_status,
+        "sponsor_tier": sponsor_tier,
+        "funding_goal": funding_goal,
+        "paid_funding": paid_funding,
+    }
+
+
+# volunteer dashboard -----
+
+
+@functools.lru_cache(maxsize=1)
+def chapter_aliases() -> pd.DataFrame:
+    """Chapter names and their ``chapter_key``, from chapter_recode.py"""
+    return pd.read_csv(chapters.CHAPTER_ALIASES_CSV)
+
+
+@functools.lru_cache(maxsize=1)
+def chapter_locations() -> pd.DataFrame:
+    """Geocoded chapters written by app-volunteer/chapter_recode.py"""
+    return pd.read_csv(CHAPTER_CSV)[
+        [
+            "chapter_key",
+            "chapter",
+            "latitude",
+            "longitude",
+            "country",
+            "continent",
+        ]
+    ]
+
+
+@functools.lru_cache(maxsize=2)
+def volunteer_frames(data: StatsData) -> dict[str, pd.DataFrame]:
+    """Volunteer breakdowns, sorted for display, plus the chapter merge"""
+    # dictionary of DataFrames keyed by chart_id
+    breakdown_dfs = {}
+    for item in data.stats["volunteer_breakdown"]:
+        breakdown_dfs[item["chart_id"]] = pd.DataFrame(
+            item["data"], columns=item["columns"]
+        )
+
+    df_by_chapter = (
+        breakdown_dfs["volunteer_by_chapter"]
+        .sort_values("Chapter")
+        .reset_index(drop=True)
+    )
+    df_by_region = (
+        breakdown_dfs["volunteers_by_region"]
+        .sort_values("Volunteers")
+        .reset_index(drop=True)
+    )
+    df_by_language = (
+        breakdown_dfs["volunteers_by_languages"]
+        .sort_values("Language")
+        .reset_index(drop=True)
+    )
+
+    # one row per chapter, however many spellings of its name there are
+    keys = chapters.chapter_keys(df_by_chapter["Chapter"], chapter_aliases())
+    located = (
+        df_by_chapter
+        .assign(chapter_key=keys)
+        .groupby("chapter_key", as_index=False, sort=False)
+        .agg(Chapter=("Chapter", "first"), Volunteers=("Volunteers", "sum"))
+        .merge(chapter_locations(), on="chapter_key", how="left")
+    )
+    # named as chapter_recode.py shows the chapter, if it has seen it
+    df_by_chapter_geocode = located.assign(
+        Chapter=located["chapter"].fillna(located["Chapter"])
+    ).drop(columns=["chapter_key", "chapter"])
+
+    return {
+        "df_by_chapter": df_by_chapter,
+        "df_by_region": df_by_region,
+        "df_by_language": df_by_language,
+        "df_by_chapter_geocode": df_by_chapter_geocode,
+    }
+
+
+@functools.lru_cache(maxsize=2)
+def continent_frame(data: StatsData) -> gpd.GeoDataFrame:
+    """Continents for the "Total Volunteers by Continent" choropleth"""
+    df_by_region = volunteer_frames(data)["df_by_region"]
+    regions = countries.continent_names(df_by_region["Region"])
+    volunteers = df_by_region.groupby(regions.fillna(df_by_region["Region"]))
+    return geometry.choropleth_frame(
+        geometry.choropleth_shapes(("continent",), by="continent"),
+        key="continent",
+        values=volunteers["Volunteers"].sum().to_dict(),
+        key_name="Continent",
+        value_name="Volunteers",
+    )
+
+
+@functools.lru_cache(maxsize=2)
+def chapter_points(data: StatsData) -> gpd.GeoDataFrame:
+    """Geocoded chapters as points, dropping any without coordinates"""
+    geocoded = volunteer_frames(data)["df_by_chapter_geocode"]
+    return geometry.point_frame(
+        geocoded["longitude"],
+        geocoded["latitude"],
+        {
+            "Chapter": geocoded["Chapter"],
+            "Volunteers": geocoded["Volunteers"],
+            "Country": countries.country_names(geocoded["country"]).fillna(
+                geocoded["country"]
+            ),
+        },
+    )
+
+
+def _chapter_coordinates(data: StatsData) -> pd.DataFrame:
+    # chapter_points with longitude and latitude columns for geometry
+    points = chapter_points(data)
+    return pd.DataFrame(points.drop(columns="geometry")).assign(
+        longitude=points.geometry.x, latitude=points.geometry.y
+    )
+
+
+@functools.lru_cache(maxsize=2)
+def chapter_index(data: StatsData) -> nearby.ChapterIndex:
+    """Spatial index of ``chapter_points`` for nearest-chapter lookups"""
+    return nearby.ChapterIndex(_chapter_coordinates(data))
+
+
+# The latest clusters built, updated for the next data version
+_clusters: pointclusters.ClusterIndex | None = None
+_clusters_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=2)
+def chapter_clusters(data: StatsData) -> pointclusters.ClusterIndex:
+    """Chapters clustered per zoom level for the chapter map.
+
+    Built from the previous version's clusters when there are any, so new
+    stats only cost the chapters that were added, removed or changed.
+    """
+    global _clusters
+    chapters = _chapter_coordinates(data)
+    with _clusters_lock:
+        if _clusters is None:
+            _clusters = pointclusters.ClusterIndex(chapters)
+        else:
+            _clusters = _clusters.updated(chapters)
+        return _clusters
+
+
+# vector tiles -----
+
+
+@functools.lru_cache(maxsize=1)
+def country_tiles() -> str:
+    """Tile archive of every country, with its name as ``Country`` and
+    ISO 3166-1 alpha-3 code as ``ISO``
+    """
+    shapes = geometry.choropleth_shapes(("name",))
+    shapes = shapes.assign(
+        Country=countries.country_names(shapes["name"]),
+        ISO=countries.iso_codes(shapes["name"]),
+    )
+    return tiles.write_pmtiles(
+        "countries", {"countries": shapes[["Country", "ISO", "geometry"]]}
+    )
+
+
+@functools.lru_cache(maxsize=2)
+def volunteer_tiles(data: StatsData) -> str:
+    """Tile archive with the ``continents`` layer; chapters are clustered
+    for the current view instead (``chapter_clusters``)
+    """
+    return tiles.write_pmtiles(
+        "volunteers", {"continents": continent_frame(data)}
+    )
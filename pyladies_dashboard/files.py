@@ -0,0 +1,36 @@
+"""Replacing files atomically.
+
+The new content is written to a temporary file next to the target,
+flushed to disk, and renamed over it: readers, and whatever is left
+after a crash, see the old file or the new one, never part of either.
+"""
+
+import os
+import secrets
+from collections.abc import Callable
+from pathlib import Path
+
+
+def replace_file(
+    path: Path, write: Callable[[Path], None], mtime: float | None = None
+) -> None:
+    """Replace ``path`` with what ``write(tmp_path)`` writes.
+
+    ``mtime``, if given, is set on the new file before it replaces the
+    old one.
+    """
+    path = Path(path)
+    # created by ``write``, so with the usual permissions
+    tmp = path.with_name(f".{path.name}.{secrets.token_hex(6)}.tmp")
+    try:
+        write(tmp)
+        fd = os.open(tmp, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if mtime is not None:
+            os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
@@ -0,0 +1,262 @@
+"""Offline geocoding of chapter names against a bundled gazetteer.
+
+``geodata/gazetteer.csv.gz`` lists the cities of 15,000 people or more
+(GeoNames ``cities15000``) with their alternate names, coordinates,
+country and population. It contains data from GeoNames
+(https://www.geonames.org/), licensed under CC BY 4.0; see
+``geodata/README.md``. ``Gazetteer`` indexes every name folded to
+lower-case ASCII (diacritics and punctuation dropped), in a hash map for
+exact hits and trigram postings for fuzzy ones, so a lookup takes
+microseconds and chapter_recode.py only needs the remote API for names
+it misses.
+
+A lookup answers only when the name is unambiguous:
+
+* a place's own name, or else an alternate name, matches exactly; of
+  several places with that name, the most populous;
+* otherwise the most similar place name, if it is at least
+  ``MIN_SIMILARITY`` alike and ``MIN_MARGIN`` more alike than any other.
+
+Names of countries and continents ("Mexico", "Ghana", "Africa") match
+nothing, not a capital, a namesake elsewhere or a place they are an
+alternate name of; nor do single words of a longer name given as its
+alternate ("North" for North Salt Lake). Anything else is a miss too,
+left to the API.
+
+Rebuild the file with::
+
+    python -m pyladies_dashboard.gazetteer [SOURCE ...]
+
+where each SOURCE is a GeoNames dump (``cities15000.zip`` from
+``GEONAMES_URL`` by default, or a larger one such as ``cities5000``).
+Earlier sources win when two give the same place. Alternate names are
+kept only if they fold to ASCII, which keeps Latin spellings ("Munich",
+"Muenchen") and the file small.
+"""
+
+import csv
+import functools
+import sys
+import warnings
+from collections import defaultdict
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from . import countries, geometry
+from .names import TrigramIndex, fold, name_parts
+
+GAZETTEER_FILE = (
+    Path(__file__).resolve().parent / "geodata" / "gazetteer.csv.gz"
+)
+GEONAMES_URL = "https://download.geonames.org/export/dump/cities15000.zip"
+
+COLUMNS = [
+    "name",
+    "alternates",
+    "latitude",
+    "longitude",
+    "country",
+    "population",
+]
+
+GEONAMES_COLUMNS = [
+    "geonameid",
+    "name",
+    "asciiname",
+    "alternatenames",
+    "latitude",
+    "longitude",
+    "feature_class",
+    "feature_code",
+    "country_code",
+    "cc2",
+    "admin1_code",
+    "admin2_code",
+    "admin3_code",
+    "admin4_code",
+    "population",
+    "elevation",
+    "dem",
+    "timezone",
+    "modification_date",
+]
+
+# Trigram similarity (Dice coefficient) a fuzzy match needs
+MIN_SIMILARITY = 0.75
+# ... and how much more alike it must be than the next name
+MIN_MARGIN = 0.1
+
+
+class Gazetteer:
+    """Name index over a frame with the gazetteer ``COLUMNS``"""
+
+    source = "gazetteer"
+
+    def __init__(self, places: pd.DataFrame):
+        self.places = places.reset_index(drop=True)
+        self._own: dict[str, list[int]] = defaultdict(list)
+        self._alternate: dict[str, list[int]] = defaultdict(list)
+        for i, (name, alternates) in enumerate(
+            zip(self.places["name"], self.places["alternates"].fillna(""))
+        ):
+            own = set(name_parts(name))
+            words = fold(name).split()
+            for n in own:
+                self._own[n].append(i)
+            for alternate in filter(None, alternates.split("|")):
+                for n in set(name_parts(alternate)) - own:
+                    if len(words) == 1 or n not in words:
+                        self._alternate[n].append(i)
+        self.names = list(self._own)
+        self._trigrams = TrigramIndex(self.names)
+        self._population = self.places["population"].fillna(0).to_numpy()
+
+    def _exact(self, name: str) -> int | None:
+        if countries.is_region(name):
+            return None
+        rows = self._own.get(name) or self._alternate.get(name)
+        if not rows:
+            return None
+        return rows[int(np.argmax(self._population[rows]))]
+
+    def _fuzzy(self, name: str) -> tuple[str | None, float, float]:
+        """The place name most like ``name``, how alike, and by how much
+        more than the next
+        """
+        ids, score = self._trigrams.scores(name)
+        if not len(ids):
+            return None, 0.0, 0.0
+        top = np.argsort(-score)[:2]
+        best = float(score[top[0]])
+        lead = best - (float(score[top[1]]) if len(top) > 1 else 0.0)
+        return self.names[ids[top[0]]], best, lead
+
+    def match(self, query: str) -> int | None:
+        """Row of ``places`` that ``query`` names, or None.
+
+        The whole name and then each of its parts are tried exactly, then
+        by trigram similarity.
+        """
+        parts = name_parts(query)
+        for part in parts:
+            row = self._exact(part)
+            if row is not None:
+                return row
+        for part in parts:
+            if countries.is_region(part):
+                continue
+            name, similarity, lead = self._fuzzy(part)
+            if similarity >= MIN_SIMILARITY and lead >= MIN_MARGIN:
+                return self._exact(name)
+        return None
+
+    def geocode(self, query: str) -> dict | None:
+        """Like ``Geocoder.geocode``, from the gazetteer alone"""
+        row = self.match(query)
+        if row is None:
+            return None
+        place = self.places.iloc[row]
+        return {
+            "latitude": float(place["latitude"]),
+            "longitude": float(place["longitude"]),
+            "country": place["country"],
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def load_gazetteer(path: Path = GAZETTEER_FILE) -> Gazetteer:
+    """The bundled gazetteer, indexed once per process"""
+    return Gazetteer(pd.read_csv(path, keep_default_na=False, na_values=""))
+
+
+# building -----
+
+
+def _country_names(lon, lat) -> np.ndarray:
+    """Bundled country name at each point, or nearby for coastal places"""
+    points = gpd.GeoDataFrame(
+        geometry=gpd.points_from_xy(lon, lat), crs="EPSG:4326"
+    )
+    with warnings.catch_warnings():
+        # Nearest in degrees is good enough to snap coastal cities
+        warnings.simplefilter("ignore", UserWarning)
+        joined = gpd.sjoin_nearest(
+            points, geometry.read_countries(("name",)), max_distance=1.0
+        )
+    joined = joined[~joined.index.duplicated()]
+    return joined["name"].reindex(points.index).to_numpy()
+
+
+def read_places(source) -> pd.DataFrame:
+    """Places from a GeoNames dump, in the gazetteer ``COLUMNS``"""
+    df = pd.read_csv(
+        source,
+        sep="\t",
+        header=None,
+        names=GEONAMES_COLUMNS,
+        usecols=[
+            "name",
+            "asciiname",
+            "alternatenames",
+            "latitude",
+            "longitude",
+            "population",
+        ],
+        quoting=csv.QUOTE_NONE,
+        keep_default_na=False,
+    )
+    alternates = [
+        "|".join(
+            dict.fromkeys(
+                a
+                for a in [ascii_name, *names.split(",")]
+                if a and a != name and fold(a).isascii()
+            )
+        )
+        for name, ascii_name, names in zip(
+            df["name"], df["asciiname"], df["alternatenames"]
+        )
+    ]
+    country = _country_names(df["longitude"], df["latitude"])
+    return df.assign(
+        alternates=alternates,
+        country=countries.country_names(pd.Series(country)).fillna(
+            pd.Series(country)
+        ),
+    )[COLUMNS]
+
+
+def _repeated(places: pd.DataFrame) -> np.ndarray:
+    """Rows naming a place already listed, within about a degree of it"""
+    repeated = np.zeros(len(places), dtype=bool)
+    seen: dict[str, list[tuple[float, float]]] = defaultdict(list)
+    rows = zip(places["name"], places["latitude"], places["longitude"])
+    for i, (name, lat, lon) in enumerate(rows):
+        kept = seen[fold(name)]
+        if any(abs(lat - y) < 1 and abs(lon - x) < 1 for y, x in kept):
+            repeated[i] = True
+        else:
+            kept.append((lat, lon))
+    return repeated
+
+
+def build_gazetteer(*sources, path: Path = GAZETTEER_FILE) -> Path:
+    """Merge GeoNames dumps ``sources`` into the gazetteer file"""
+    sources = sources or (GEONAMES_URL,)
+    places = pd.concat([read_places(s) for s in sources], ignore_index=True)
+    places = places.dropna(subset=["latitude", "longitude"])
+    places = places[~_repeated(places)]
+    places = places.round({"latitude": 5, "longitude": 5})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # no timestamp in the gzip header, so the same places give the same file
+    places.to_csv(
+        path, index=False, compression={"method": "gzip", "mtime": 0}
+    )
+    return path
+
+
+if __name__ == "__main__":
+    print(build_gazetteer(*sys.argv[1:]))
@@ -0,0 +1,123 @@
+"""Persistent cache of chapter geocodes, in SQLite.
+
+Entries are keyed by the chapter name folded with ``cache_key`` and keep
+the name as first seen, where the answer came from and when. Places
+that were found are trusted for ``PYLADIES_GEOCODE_TTL_DAYS`` days and
+misses for ``MISS_TTL_DAYS``, so a re-run of chapter_recode.py only
+geocodes chapters that are new or whose entry has expired. Failed
+lookups are never stored and are simply tried again next time.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import unicodedata
+from collections.abc import Iterable
+from pathlib import Path
+
+GEOCODE_CACHE = Path(
+    os.getenv(
+        "PYLADIES_GEOCODE_CACHE",
+        Path(__file__).resolve().parent.parent / ".cache" / "geocode.sqlite",
+    )
+)
+FOUND_TTL_DAYS = float(os.getenv("PYLADIES_GEOCODE_TTL_DAYS", "180"))
+MISS_TTL_DAYS = 7.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    country TEXT,
+    source TEXT NOT NULL,
+    geocoded_at REAL NOT NULL
+)
+"""
+
+
+def cache_key(name: str) -> str:
+    """``name`` with Unicode compatibility forms, case and spacing folded"""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class GeocodeCache:
+    """Geocode results by chapter name; None marks a place not found"""
+
+    def __init__(
+        self,
+        path: Path = GEOCODE_CACHE,
+        ttl_days: float = FOUND_TTL_DAYS,
+        miss_ttl_days: float = MISS_TTL_DAYS,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl_days * 86400
+        self.miss_ttl = miss_ttl_days * 86400
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        with self.db:
+            self.db.execute(_SCHEMA)
+
+    def _fresh(self, queries: Iterable[str]) -> dict[str, dict | None]:
+        keys = json.dumps(sorted({cache_key(q) for q in queries}))
+        rows = self.db.execute(
+            "SELECT key, latitude, longitude, country, geocoded_at"
+            " FROM geocodes WHERE key IN (SELECT value FROM json_each(?))",
+            (keys,),
+        )
+        now = time.time()
+        fresh = {}
+        for key, lat, lon, country, geocoded_at in rows:
+            if lat is None:
+                if now - geocoded_at < self.miss_ttl:
+                    fresh[key] = None
+            elif now - geocoded_at < self.ttl:
+                fresh[key] = {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "country": country,
+                }
+        return fresh
+
+    def lookup(self, queries: Iterable[str]) -> dict[str, dict | None]:
+        """Unexpired results for those of ``queries`` that have one"""
+        queries = list(queries)
+        fresh = self._fresh(queries)
+        return {
+            query: fresh[cache_key(query)]
+            for query in queries
+            if cache_key(query) in fresh
+        }
+
+    def stale(self, queries: Iterable[str]) -> list[str]:
+        """``queries`` to geocode: new or expired, one per cache key"""
+        queries = list(queries)
+        fresh = self._fresh(queries)
+        todo = {}
+        for query in queries:
+            key = cache_key(query)
+            if key not in fresh:
+                todo.setdefault(key, query)
+        return list(todo.values())
+
+    def put(self, query: str, result: dict | None, source: str) -> None:
+        """Store ``result`` for ``query``, as answered by ``source``"""
+        found = result or {}
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key(query),
+                    query,
+                    found.get("latitude"),
+                    found.get("longitude"),
+                    found.get("country"),
+                    source,
+                    time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        self.db.close()
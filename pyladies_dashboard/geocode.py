@@ -0,0 +1,185 @@
+"""Concurrent, rate-limited client for the geocode.maps.co search API.
+
+Lookups run on a small thread pool sharing one pooled ``requests.Session``
+and a token bucket, so the provider's whole allowance of
+``PYLADIES_GEOCODE_RATE`` requests per second is used while requests are
+in flight, without ever going over it. Each attempt takes a token,
+including retries: 429 and 5xx replies and connection errors are retried
+with jittered exponential backoff, honouring ``Retry-After`` up to
+``MAX_BACKOFF`` seconds.
+"""
+
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_URL = os.getenv(
+    "PYLADIES_GEOCODE_URL", "https://geocode.maps.co/search"
+)
+# Requests per second allowed by the API plan
+GEOCODE_RATE = float(os.getenv("PYLADIES_GEOCODE_RATE", "5"))
+GEOCODE_WORKERS = int(os.getenv("PYLADIES_GEOCODE_WORKERS", "8"))
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 15)
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# Longest wait between attempts, whatever ``Retry-After`` asks for
+MAX_BACKOFF = 30.0
+
+
+class GeocodeError(RuntimeError):
+    """A lookup that failed after all its retries"""
+
+
+@dataclass
+class Lookup:
+    """Outcome of geocoding one query.
+
+    ``result`` is None when the API found nothing, or when the lookup
+    failed, in which case ``error`` says why.
+    """
+
+    query: str
+    result: dict | None = None
+    error: str | None = None
+
+
+class TokenBucket:
+    """Thread-safe limiter allowing ``rate`` calls per second.
+
+    Up to ``burst`` calls may go through at once after an idle spell.
+    Callers reserve their slot under the lock and sleep outside it, so
+    they are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Geocoder:
+    """Forward geocoding of free-text place names"""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        url: str = GEOCODE_URL,
+        rate: float = GEOCODE_RATE,
+        workers: int = GEOCODE_WORKERS,
+        timeout=TIMEOUT,
+        retries: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = MAX_BACKOFF,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bucket = TokenBucket(rate)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def source(self) -> str:
+        """Where answers come from, for provenance (the API host)"""
+        return urlparse(self.url).netloc
+
+    def _delay(self, attempt: int, response=None) -> float:
+        delay = self.backoff * 2**attempt * (0.5 + random.random())
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                retry_after = float(response.headers["Retry-After"])
+            except ValueError:
+                retry_after = math.nan  # an HTTP date; back off as usual
+            if not math.isnan(retry_after):
+                delay = retry_after
+        return min(max(delay, 0.0), self.max_backoff)
+
+    def _get(self, query: str) -> list:
+        params = {"q": query}
+        if self.api_key:
+            params["api_key"] = self.api_key
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(
+                    self.url, params=params, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, response = e, None
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+            if attempt < self.retries:
+                time.sleep(self._delay(attempt, response))
+        raise GeocodeError(f"{query!r}: {error}")
+
+    def geocode(self, query: str) -> dict | None:
+        """Best match for ``query``, or None if there is none.
+
+        Raises GeocodeError once retries are exhausted.
+        """
+        results = self._get(query)
+        if not results:
+            return None
+        result = results[0]
+        return {
+            "latitude": float(result["lat"]),
+            "longitude": float(result["lon"]),
+            "country": result.get("display_name", "").split(", ")[-1],
+        }
+
+    def geocode_many(self, queries: Iterable[str]) -> Iterator[Lookup]:
+        """Geocode ``queries`` concurrently, yielding each as it finishes.
+
+        Duplicate queries are looked up once. Failures are logged and
+        yielded with their ``error`` set rather than raised.
+        """
+        unique = list(dict.fromkeys(queries))
+        with ThreadPoolExecutor(self.workers) as pool:
+            futures = {pool.submit(self.geocode, q): q for q in unique}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning("Error geocoding %s: %s", query, e)
+                    yield Lookup(query, error=str(e))
+                else:
+                    yield Lookup(query, result)
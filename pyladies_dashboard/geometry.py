@@ -0,0 +1,177 @@
+"""Bundled Natural Earth country polygons.
+
+The dashboards read country geometry from a FlatGeobuf file checked into
+the repo instead of downloading and unzipping the Natural Earth shapefile
+at startup. FlatGeobuf carries a packed R-tree, so ``bbox`` reads only
+touch the features they need, and ``include_fields`` skips the columns
+nobody uses.
+
+Rebuild the store with::
+
+    python -m pyladies_dashboard.geometry [SOURCE]
+
+where SOURCE is anything ``geopandas.read_file`` understands (by default
+the Natural Earth 1:110m admin-0 countries zip).
+
+Choropleth layers are sent to the browser, so before that the
+polygons are dissolved to the unit the map actually shows, simplified as a
+coverage (neighbours keep sharing their edges, no slivers or gaps) and
+snapped to a coordinate grid. ``PYLADIES_SIMPLIFY_TOLERANCE`` (degrees) and
+``PYLADIES_COORD_DECIMALS`` tune the trade-off.
+"""
+
+import functools
+import logging
+import os
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+logger = logging.getLogger(__name__)
+
+NATURAL_EARTH_URL = "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip"
+
+GEOMETRY_FILE = (
+    Path(__file__).resolve().parent / "geodata" / "ne_110m_countries.fgb"
+)
+
+# Natural Earth's upper-case attribute names, lower-cased in the store
+COLUMNS = ["name", "continent", "iso_a3"]
+
+SIMPLIFY_TOLERANCE = float(os.getenv("PYLADIES_SIMPLIFY_TOLERANCE", "0.1"))
+COORD_DECIMALS = int(os.getenv("PYLADIES_COORD_DECIMALS", "2"))
+
+
+def build_geometry_store(source=NATURAL_EARTH_URL, path=GEOMETRY_FILE):
+    """Write the columns the dashboards use to a spatially indexed file"""
+    world = gpd.read_file(source)
+    world.columns = [
+        c if c == world.geometry.name else c.lower() for c in world.columns
+    ]
+    world = world[[*COLUMNS, world.geometry.name]].to_crs("EPSG:4326")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    world.to_file(path, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+    return path
+
+
+@functools.lru_cache(maxsize=8)
+def read_countries(
+    columns: tuple[str, ...] = ("name", "continent"), bbox=None
+) -> gpd.GeoDataFrame:
+    """Country polygons with only ``columns``, optionally within ``bbox``.
+
+    ``bbox`` is ``(minx, miny, maxx, maxy)`` in longitude/latitude. Results
+    are cached per process, so treat them as read-only.
+    """
+    return gpd.read_file(
+        GEOMETRY_FILE, bbox=bbox, include_fields=list(columns)
+    )
+
+
+def prepare_choropleth(
+    gdf: gpd.GeoDataFrame,
+    by: str | None = None,
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    decimals: int = COORD_DECIMALS,
+) -> gpd.GeoDataFrame:
+    """Dissolve ``gdf`` by ``by``, simplify it and quantize coordinates.
+
+    Logs the GeoJSON size before and after.
+    """
+    before = len(geojson_bytes(gdf))
+
+    if by is not None:
+        gdf = gdf.dissolve(by=by, as_index=False)
+    geoms = shapely.coverage_simplify(gdf.geometry.values, tolerance)
+    # Snap to the grid first so the result stays valid, then round so the
+    # coordinates also serialize as short decimals
+    geoms = shapely.set_precision(geoms, 10**-decimals)
+    geoms = shapely.transform(geoms, lambda xy: np.round(xy, decimals))
+    gdf = gdf.set_geometry(gpd.GeoSeries(geoms, crs=gdf.crs, index=gdf.index))
+    gdf = gdf[~gdf.geometry.is_empty]
+
+    after = len(geojson_bytes(gdf))
+    logger.info(
+        "Choropleth payload %s: %d -> %d bytes (%.0f%%)",
+        by or "as-is",
+        before,
+        after,
+        after / before * 100,
+    )
+    return gdf
+
+
+@functools.lru_cache(maxsize=4)
+def choropleth_shapes(
+    columns: tuple[str, ...] = ("name",), by: str | None = None
+) -> gpd.GeoDataFrame:
+    """``read_countries(columns)`` prepared for display, cached per process"""
+    return prepare_choropleth(read_countries(columns), by=by)
+
+
+def choropleth_frame(
+    shapes: gpd.GeoDataFrame,
+    key: str,
+    values: Mapping,
+    key_name: str,
+    value_name: str,
+) -> gpd.GeoDataFrame:
+    """Shapes whose ``key`` is in ``values``, ready to display.
+
+    The result has just the columns ``key_name`` (the key), ``value_name``
+    (its value) and the geometry, so it goes straight to a tile layer or
+    ``geojson_bytes`` with no property rewriting afterwards.
+    """
+    keys = shapes[key]
+    shown = keys.isin(list(values))
+    return gpd.GeoDataFrame(
+        {
+            key_name: keys[shown],
+            value_name: keys[shown].map(values),
+        },
+        geometry=shapes.geometry[shown],
+        crs=shapes.crs,
+    )
+
+
+def geojson_bytes(gdf: gpd.GeoDataFrame) -> bytes:
+    """``gdf`` as a GeoJSON FeatureCollection, serialized column-wise.
+
+    Geometries go through GEOS and properties through pandas' JSON writer
+    in one call each, instead of building a dict per feature.
+    """
+    geometries = shapely.to_geojson(gdf.geometry.values)
+    properties = gdf.drop(columns=gdf.geometry.name).to_json(
+        orient="records", lines=True
+    )
+    features = ",".join(
+        f'{{"type":"Feature","properties":{p},"geometry":{g}}}'
+        for p, g in zip(properties.split("\n"), geometries)
+    )
+    return f'{{"type":"FeatureCollection","features":[{features}]}}'.encode()
+
+
+def point_frame(lon, lat, properties: dict) -> gpd.GeoDataFrame:
+    """Points from coordinate and property columns, in one vectorized pass.
+
+    Rows with a missing or non-finite coordinate are dropped by mask.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    mask = np.isfinite(lon) & np.isfinite(lat)
+    return gpd.GeoDataFrame(
+        {
+            name: np.asarray(column)[mask]
+            for name, column in properties.items()
+        },
+        geometry=shapely.points(lon[mask], lat[mask]),
+        crs="EPSG:4326",
+    )
+
+
+if __name__ == "__main__":
+    print(build_geometry_store(*sys.argv[1:2]))
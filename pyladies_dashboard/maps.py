@@ -0,0 +1,143 @@
+"""In-place updates for live maplibre outputs.
+
+Re-rendering a ``render_maplibregl`` output rebuilds the map in the
+browser: the style loads again, controls are recreated and the camera
+jumps back to its starting position. When only the data behind an
+overlay changes, ``MapContext`` instead swaps the overlay's source on the
+live map, a message of a few hundred bytes after which the browser
+fetches just the tiles in view.
+
+The same goes for the page's color mode: both basemap styles have the
+same layers, so ``follow_theme`` repaints them and the overlays with
+``setPaintProperty`` calls, keeping sources, loaded tiles and camera.
+
+Points too many to draw one by one are clustered on the server
+(``pointclusters``) and ``follow_clusters`` sends a GeoJSON source just
+the clusters in view whenever the map moves.
+
+Build the map with the source URL and theme read inside
+``reactive.isolate()``, so the output doesn't depend on them, and call
+``follow_source``, ``follow_theme`` and ``follow_clusters`` next to it.
+"""
+
+from collections.abc import Callable
+
+from maplibre import Map, MapContext
+from shiny import reactive
+
+from . import assets, pointclusters
+
+
+def replace_source(
+    m: Map, source_id: str, source: dict, layers: list[dict]
+) -> None:
+    """Queue calls on ``m`` that point ``source_id`` at ``source``.
+
+    ``layers`` are the layers drawn from the source, bottom to top. They
+    have to go before the source can, and are added back on top of the
+    style; tooltips are bound by layer id and keep working.
+    """
+    for layer in reversed(layers):
+        m.add_call("removeLayer", layer["id"])
+    m.add_call("removeSource", source_id)
+    m.add_source(source_id, source)
+    for layer in layers:
+        m.add_layer(layer)
+
+
+def follow_source(
+    map_id: str,
+    source_id: str,
+    url: Callable[[], str],
+    layers: Callable[[], list[dict]],
+) -> None:
+    """Keep the vector source ``source_id`` of map ``map_id`` at ``url()``.
+
+    ``layers()`` gives the layers drawn from the source, as currently
+    shown. Nothing is sent while the URL stays the same, e.g. when new
+    stats leave a content-hashed tile archive unchanged.
+    """
+    shown = None
+
+    @reactive.effect
+    async def _update():
+        nonlocal shown
+        current = url()
+        if shown is not None and current != shown:
+            with reactive.isolate():
+                current_layers = layers()
+            async with MapContext(map_id) as m:
+                replace_source(
+                    m,
+                    source_id,
+                    {"type": "vector", "url": current},
+                    current_layers,
+                )
+        shown = current
+
+
+def theme_paint(theme: str, layers: list[dict]) -> dict[str, dict]:
+    """Paint of the basemap in ``theme`` and of ``layers``, by layer id"""
+    paint = assets.basemap_paint(assets.BASEMAP_THEMES[theme])
+    for layer in layers:
+        paint[layer["id"]] = layer.get("paint", {})
+    return paint
+
+
+def follow_theme(
+    map_id: str,
+    theme: Callable[[], str],
+    layers: Callable[[str], list[dict]] = lambda theme: [],
+) -> None:
+    """Repaint map ``map_id`` when ``theme()`` changes.
+
+    ``layers(theme)`` gives the overlay layers as drawn in ``theme``; only
+    their paint is sent.
+    """
+    shown = None
+
+    @reactive.effect
+    async def _update():
+        nonlocal shown
+        current = theme()
+        if shown is not None and current != shown:
+            repaint = theme_paint(current, layers(current))
+            async with MapContext(map_id) as m:
+                for layer_id, paint in repaint.items():
+                    for name, value in paint.items():
+                        m.set_paint_property(layer_id, name, value)
+        shown = current
+
+
+def follow_clusters(
+    map_id: str,
+    source_id: str,
+    index: Callable[[], pointclusters.ClusterIndex],
+    view_state: Callable[[], dict],
+) -> None:
+    """Fill the GeoJSON source ``source_id`` of map ``map_id`` with the
+    clusters of ``index()`` in view.
+
+    ``view_state()`` is the map's ``{map_id}_view_state`` input, which the
+    browser sends as the map loads and after every move or zoom. Nothing
+    is sent when the clusters in view haven't changed.
+    """
+    shown = None
+
+    @reactive.effect
+    async def _update():
+        nonlocal shown
+        view = view_state()
+        bounds = view["bounds"]
+        clusters = index().clusters(
+            bounds["_sw"]["lng"],
+            bounds["_sw"]["lat"],
+            bounds["_ne"]["lng"],
+            bounds["_ne"]["lat"],
+            view["zoom"],
+        )
+        features = pointclusters.feature_collection(clusters)
+        if features != shown:
+            async with MapContext(map_id) as m:
+                m.set_data(source_id, features)
+        shown = features
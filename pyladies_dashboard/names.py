@@ -0,0 +1,69 @@
+"""Folding and trigram similarity for free-text place and chapter names.
+
+``fold`` reduces a name to lower-case ASCII words, so "Bogotá", "bogota"
+and "BOGOTA!" compare equal. ``TrigramIndex`` scores a name against many
+others at once: each indexed name is posted under its character
+trigrams, and the Dice coefficient of two names is twice the trigrams
+they share over their total.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Sequence
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[^\w]+")
+# "Aba / Abia State", "Lagos, Nigeria", "Bay Area (San Francisco)"
+_PARTS = re.compile(r"\s*(?:/|,|\(|\)|\s-\s)\s*")
+
+
+def fold(name: str) -> str:
+    """Lower-case ``name`` without diacritics, punctuation or extra spaces"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_PUNCTUATION.sub(" ", stripped.casefold()).split())
+
+
+def name_parts(query: str) -> list[str]:
+    """``query`` folded, then each part of a split name"""
+    parts = [fold(query)]
+    for part in _PARTS.split(query):
+        folded = fold(part)
+        if folded and folded not in parts:
+            parts.append(folded)
+    return [p for p in parts if p]
+
+
+def trigrams(folded: str) -> set[str]:
+    padded = f"  {folded} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Dice similarity of a folded name to every name in ``names``"""
+
+    def __init__(self, names: Sequence[str]):
+        postings: dict[str, list[int]] = defaultdict(list)
+        self._sizes = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            grams = trigrams(name)
+            self._sizes[i] = len(grams)
+            for gram in grams:
+                postings[gram].append(i)
+        self._postings = {
+            gram: np.array(ids, dtype=np.int64)
+            for gram, ids in postings.items()
+        }
+
+    def scores(self, folded: str) -> tuple[np.ndarray, np.ndarray]:
+        """Positions of the names sharing a trigram with ``folded``, and
+        their similarity to it, from 0 to 1
+        """
+        grams = trigrams(folded)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        return ids, 2 * shared / (len(grams) + self._sizes[ids])
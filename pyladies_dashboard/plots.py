@@ -0,0 +1,299 @@
+"""Process-wide cache of rendered plotnine charts.
+
+``@render.plot`` rasterizes a figure for every session and on every
+container resize, although all sessions see the same data. The
+``cached_plot`` renderer instead keys the PNG by data version, output id,
+size bucket, pixel density and theme, and keeps it in an LRU cache capped
+at ``PYLADIES_PLOT_CACHE_MB`` megabytes shared by the whole process.
+
+Images are drawn at the size of the container that asked first. The size
+bucket is its width rounded up to ``SIZE_STEP`` pixels and its aspect
+ratio to ``ASPECT_DIGITS`` decimals, so a container a little larger or
+smaller but of the same shape reuses the image, scaled by the browser
+without stretching. A resize that would need a new rasterization waits
+until the size has been stable for ``RESIZE_DEBOUNCE`` seconds, showing
+the previous image meanwhile.
+
+Rasterizing is CPU-bound. With ``PYLADIES_RENDER_WORKERS`` set, charts
+returned as a ``PlotJob`` are built and saved in a pool of worker
+processes through a Shiny ``ExtendedTask``, so neither the event loop nor
+other sessions wait on matplotlib.
+"""
+
+import asyncio
+import base64
+import io
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import ProcessPoolExecutor
+
+from plotnine import options as p9options
+from shiny import reactive, render
+from shiny.session import require_active_session
+from shiny.types import SilentCancelOutputException, SilentException
+
+logger = logging.getLogger(__name__)
+
+CACHE_BYTES = int(float(os.getenv("PYLADIES_PLOT_CACHE_MB", "64")) * 2**20)
+SIZE_STEP = int(os.getenv("PYLADIES_PLOT_SIZE_STEP", "50"))
+# Containers whose width / height agree to this many decimals share images
+ASPECT_DIGITS = 2
+RESIZE_DEBOUNCE = float(os.getenv("PYLADIES_RESIZE_DEBOUNCE", "0.4"))
+# 0 rasterizes in the server process
+RENDER_WORKERS = int(os.getenv("PYLADIES_RENDER_WORKERS", "0"))
+
+
+class PlotCache:
+    """Thread-safe LRU of rendered images, bounded by total size"""
+
+    def __init__(self, max_bytes: int = CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._images: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: Hashable, image: str) -> None:
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._images[key] = image
+            self.size += len(image)
+            # Always keep the newest image, even if it alone is too big
+            while self.size > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self.size = 0
+
+
+# Shared by every session in this process
+plot_cache = PlotCache()
+
+
+def size_bucket(px: float, step: int = SIZE_STEP) -> int:
+    """Round a container dimension up to a multiple of ``step``"""
+    return max(step, math.ceil(px / step) * step)
+
+
+def rasterize(plot, width: int, height: int, pixelratio: float = 1) -> str:
+    """PNG data URI of a ggplot drawn at ``width`` x ``height`` CSS pixels"""
+    ppi = p9options.dpi
+    # A hair over: matplotlib truncates the size to whole pixels, and
+    # 251 / ppi * ppi comes out just under 251
+    pad = 1e-6
+    with io.BytesIO() as buf:
+        plot.save(
+            buf,
+            format="png",
+            units="in",
+            width=width / ppi + pad,
+            height=height / ppi + pad,
+            dpi=ppi * pixelratio,
+            verbose=False,
+        )
+        encoded = base64.b64encode(buf.getvalue()).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
+class PlotJob:
+    """A chart as ``fn(*args) -> ggplot``, picklable for a worker process.
+
+    ``fn`` must be importable (defined at module level in a package, not
+    in an app file) and ``args`` picklable, e.g. data frames.
+    """
+
+    def __init__(self, fn: Callable, *args):
+        self.fn = fn
+        self.args = args
+
+    def build(self):
+        return self.fn(*self.args)
+
+
+def _render_job(job: PlotJob, width, height, pixelratio) -> str:
+    return rasterize(job.build(), width, height, pixelratio)
+
+
+def _warm_up() -> None:
+    # Pay for the plotnine/matplotlib imports when the worker starts
+    import plotnine  # noqa: F401
+
+
+class RenderExecutor:
+    """Bounded pool of processes that rasterize ``PlotJob``s.
+
+    ``queue_depth`` is the number of jobs submitted but not yet finished.
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS):
+        self.workers = workers
+        self.queue_depth = 0
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Forking a process that runs threads (uvicorn, the stats
+                # scheduler) is unsafe, so start clean interpreters
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_up,
+                )
+            return self._pool
+
+    def start(self) -> None:
+        """Spawn the workers now rather than on the first chart (once)"""
+        if self.enabled and self._pool is None:
+            self._get_pool().submit(_warm_up)
+
+    async def rasterize(
+        self, job: PlotJob, width: int, height: int, pixelratio: float = 1
+    ) -> str:
+        """``rasterize(job.build(), ...)`` in a worker process"""
+        pool = self._get_pool()
+        with self._lock:
+            self.queue_depth += 1
+            depth = self.queue_depth
+        logger.debug("Render queue depth %d", depth)
+        try:
+            return await asyncio.wrap_future(
+                pool.submit(_render_job, job, width, height, pixelratio)
+            )
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+# Shared by every session in this process
+render_executor = RenderExecutor()
+
+
+class cached_plot(render.plot):
+    """``render.plot`` for plotnine figures, backed by ``plot_cache``.
+
+    ``version`` is a reactive callable identifying the data the figure is
+    drawn from (e.g. the stats version); the decorated function is only
+    called on a cache miss. ``theme`` optionally names the page theme.
+
+    The function returns a ggplot, or a ``PlotJob`` that can also be
+    rendered by ``render_executor``.
+    """
+
+    def __init__(
+        self,
+        _fn=None,
+        *,
+        version: Callable[[], Hashable],
+        theme: Callable[[], Hashable] | None = None,
+        alt: str | None = None,
+    ):
+        super().__init__(_fn, alt=alt)
+        self.version = version
+        self.theme = theme
+        self._size = None
+        self._resized_at = 0.0
+        self._rendered = False
+        self._task = reactive.ExtendedTask(self._render_in_pool)
+        self._task_key = None
+
+    @staticmethod
+    async def _render_in_pool(key, job, width, height, pixelratio) -> None:
+        image = await render_executor.rasterize(job, width, height, pixelratio)
+        plot_cache.put(key, image)
+
+    async def render(self):
+        session = require_active_session(None)
+        output_name = session.ns(self.output_id)
+        inputs = session.root_scope().input
+        pixelratio = inputs[".clientdata_pixelratio"]()
+        size = (
+            inputs[f".clientdata_output_{output_name}_width"](),
+            inputs[f".clientdata_output_{output_name}_height"](),
+        )
+        now = time.monotonic()
+        if size != self._size:
+            self._size = size
+            self._resized_at = now
+
+        width, height = max(1, round(size[0])), max(1, round(size[1]))
+        key = (
+            self.version(),
+            output_name,
+            size_bucket(width),
+            round(width / height, ASPECT_DIGITS),
+            pixelratio,
+            self.theme() if self.theme else None,
+        )
+        image = plot_cache.get(key)
+        if image is None:
+            # Mid-resize: keep the current image and look again once the
+            # size has settled, instead of rasterizing every step
+            wait = self._resized_at + RESIZE_DEBOUNCE - now
+            if self._rendered and wait > 0:
+                reactive.invalidate_later(wait)
+                raise SilentCancelOutputException()
+            job = await self.fn()
+            if isinstance(job, PlotJob) and render_executor.enabled:
+                # Rendered off the reactive graph; finishing the task
+                # invalidates this output, which then hits the cache
+                if self._task_key != key:
+                    self._task_key = key
+                    self._task.invoke(key, job, width, height, pixelratio)
+                try:
+                    self._task.result()
+                except SilentException:
+                    raise
+                except Exception:
+                    # Shown as the output's error; the next render retries
+                    self._task_key = None
+                    raise
+                image = plot_cache.get(key)
+                if image is None:
+                    # Evicted before this output read it: draw it again
+                    self._task.invoke(key, job, width, height, pixelratio)
+                    raise SilentCancelOutputException()
+            else:
+                if isinstance(job, PlotJob):
+                    job = job.build()
+                image = rasterize(job, width, height, pixelratio)
+                plot_cache.put(key, image)
+
+        self._rendered = True
+        result = {"src": image, "width": "100%", "height": "100%"}
+        if self.alt:
+            result["alt"] = self.alt
+        return result
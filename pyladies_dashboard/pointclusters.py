@@ -0,0 +1,248 @@
+"""Chapters clustered per zoom level, for maps with many points.
+
+Each zoom level from 0 to ``MAX_ZOOM`` divides the Web Mercator world
+into square cells ``CELL_SIZE`` screen pixels wide at that zoom (tiles
+being ``TILE_SIZE`` pixels), and every cell holding chapters is one
+cluster. A cell keeps only sums (chapters, ``Volunteers``, coordinates
+and chapter ids), so:
+
+- a cluster is drawn at the mean position of its chapters, with their
+  total volunteers, and a cell with one chapter shows that chapter;
+- adding or removing chapters updates the cells they fall in and nothing
+  else, giving the same clusters as a full rebuild: the same counts,
+  totals and single chapters, and positions off by float rounding at
+  most;
+- a viewport is a range of cell codes, sorted by column, so a query
+  reads only the columns in view.
+
+Cells don't merge across their edges, unlike the greedy radius
+clustering of Mapbox's supercluster, the price of cheap incremental
+updates.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+MAX_ZOOM = 16
+TILE_SIZE = 512
+CELL_SIZE = 64
+
+# Web Mercator stops short of the poles
+MAX_LATITUDE = 85.05112878
+
+# What a cell sums, in the columns of its row in ``_Level.sums``. The
+# counts and ids are whole numbers, exact in float64; the coordinate sums
+# pick up rounding error as chapters come and go
+_SUMS = ["chapters", "Volunteers", "x", "y", "id_sum"]
+
+
+def mercator(lon, lat) -> tuple[np.ndarray, np.ndarray]:
+    """``lon``, ``lat`` in degrees to Web Mercator ``x``, ``y`` in [0, 1],
+    ``y`` growing southward as on tiles
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = lon / 360 + 0.5
+    y = 0.5 - np.log(np.tan(np.pi / 4 + lat / 2)) / (2 * np.pi)
+    return x, y
+
+
+def inverse_mercator(x, y) -> tuple[np.ndarray, np.ndarray]:
+    lon = (np.asarray(x) - 0.5) * 360
+    lat = np.degrees(2 * np.arctan(np.exp((0.5 - np.asarray(y)) * 2 * np.pi)))
+    return lon, lat - 90
+
+
+def cells_per_side(zoom: int) -> int:
+    return TILE_SIZE * 2**zoom // CELL_SIZE
+
+
+def _cell(v, n: int) -> np.ndarray:
+    return np.clip(np.floor(np.asarray(v) * n), 0, n - 1).astype(np.int64)
+
+
+class _Level:
+    """Cells of one zoom level: ``code`` in order, and the ``sums`` of
+    each as a row
+    """
+
+    def __init__(self):
+        self.code = np.empty(0, dtype=np.int64)
+        self.sums = np.empty((0, len(_SUMS)))
+
+    def add(self, code: np.ndarray, values: np.ndarray) -> None:
+        """Add ``values``, one row per point, to the cells at ``code``"""
+        cells, point_cell = np.unique(code, return_inverse=True)
+        sums = np.column_stack([
+            np.bincount(point_cell, column, len(cells)) for column in values.T
+        ])
+        at = np.searchsorted(self.code, cells)
+        found = at < len(self.code)
+        found[found] = self.code[at[found]] == cells[found]
+        self.sums[at[found]] += sums[found]
+        if not found.all():
+            self.code = np.insert(self.code, at[~found], cells[~found])
+            self.sums = np.insert(self.sums, at[~found], sums[~found], axis=0)
+        empty = self.sums[:, 0] < 0.5
+        if empty.any():
+            self.code = self.code[~empty]
+            self.sums = self.sums[~empty]
+
+
+class ClusterIndex:
+    """Clusters of ``chapters``, a frame with ``longitude``, ``latitude``
+    and ``Volunteers`` columns plus any properties to show for single
+    chapters.
+
+    ``updated`` gives the index for a new version of the chapters from
+    this one, touching only the chapters that differ.
+    """
+
+    def __init__(self, chapters: pd.DataFrame, max_zoom: int = MAX_ZOOM):
+        self.max_zoom = max_zoom
+        # every chapter ever added, by id; removed ones stay so ids are
+        # stable, and only the others are in ``hashes``
+        self.chapters = chapters.iloc[:0].reset_index(drop=True)
+        self.hashes = pd.Series([], dtype=np.uint64)
+        self.levels = [_Level() for _ in range(max_zoom + 1)]
+        self.add(chapters)
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _apply(self, chapters: pd.DataFrame, sign: int) -> None:
+        x, y = mercator(chapters["longitude"], chapters["latitude"])
+        values = sign * np.column_stack([
+            np.ones(len(chapters)),
+            chapters["Volunteers"],
+            x,
+            y,
+            chapters.index,
+        ])
+        for zoom, level in enumerate(self.levels):
+            n = cells_per_side(zoom)
+            level.add(_cell(x, n) * n + _cell(y, n), values)
+
+    def _hash(self, chapters: pd.DataFrame) -> pd.Series:
+        return pd.util.hash_pandas_object(
+            chapters[self.chapters.columns], index=False
+        )
+
+    def add(self, chapters: pd.DataFrame) -> None:
+        """Add ``chapters``, which take the next ids"""
+        start = len(self.chapters)
+        chapters = chapters.set_axis(
+            pd.RangeIndex(start, start + len(chapters))
+        )
+        self.chapters = pd.concat([self.chapters, chapters])
+        self.hashes = pd.concat([self.hashes, self._hash(chapters)])
+        self._apply(chapters, 1)
+
+    def remove(self, ids) -> None:
+        """Remove the chapters with ``ids``"""
+        ids = self.hashes.index.intersection(ids)
+        self._apply(self.chapters.loc[ids], -1)
+        self.hashes = self.hashes.drop(ids)
+
+    def updated(self, chapters: pd.DataFrame) -> "ClusterIndex":
+        """Index of ``chapters``, made from a copy of this one by removing
+        the chapters no longer there and adding the new ones (a row that
+        changed counts as both). Rebuilt from scratch once most ids would
+        belong to removed chapters.
+        """
+        hashes = self._hash(chapters)
+        gone = self.hashes.index[~self.hashes.isin(hashes)]
+        new = chapters[~hashes.isin(self.hashes).to_numpy()]
+        removed = len(self.chapters) - len(self) + len(gone)
+        if removed > len(chapters):
+            return ClusterIndex(chapters, self.max_zoom)
+        # a copy, as sessions may still be showing this version
+        index = copy.copy(self)
+        index.levels = [copy.copy(level) for level in self.levels]
+        for level in index.levels:
+            level.sums = level.sums.copy()
+        index.remove(gone)
+        index.add(new)
+        return index
+
+    def clusters(
+        self, west: float, south: float, east: float, north: float, zoom
+    ) -> pd.DataFrame:
+        """Clusters in the view between longitudes ``west`` and ``east``
+        and latitudes ``south`` and ``north`` at ``zoom``: ``longitude``,
+        ``latitude``, ``chapters`` and ``Volunteers`` of each, and the
+        other columns of single chapters.
+
+        ``west`` and ``east`` may go past ±180° as the map wraps around.
+        """
+        z = int(np.clip(np.floor(zoom), 0, self.max_zoom))
+        level = self.levels[z]
+        n = cells_per_side(z)
+        # columns in view, split where the view crosses the antimeridian
+        width = east - west
+        if width >= 360:
+            spans = [(-180.0, 180.0)]
+        else:
+            west = (west + 180) % 360 - 180
+            spans = [(west, min(west + width, 180))]
+            if west + width > 180:
+                spans.append((-180.0, west + width - 360))
+        _, top = mercator(0, north)
+        _, bottom = mercator(0, south)
+        first_row, last_row = _cell(top, n), _cell(bottom, n)
+        in_view = []
+        for left, right in spans:
+            left, _ = mercator(left, 0)
+            right, _ = mercator(right, 0)
+            start, stop = np.searchsorted(
+                level.code, [_cell(left, n) * n, (_cell(right, n) + 1) * n]
+            )
+            row = level.code[start:stop] % n
+            in_view.append(
+                start + np.flatnonzero((row >= first_row) & (row <= last_row))
+            )
+        chapters, volunteers, x, y, id_sum = level.sums[
+            np.concatenate(in_view)
+        ].T
+        lon, lat = inverse_mercator(x / chapters, y / chapters)
+        found = pd.DataFrame({
+            "longitude": lon,
+            "latitude": lat,
+            "chapters": chapters.astype(np.int64),
+            "Volunteers": volunteers.astype(self.chapters["Volunteers"].dtype),
+        })
+        single = np.flatnonzero(chapters == 1)
+        columns = self.chapters.columns.drop(["longitude", "latitude"])
+        properties = self.chapters.take(id_sum[single].astype(np.int64))[
+            columns.drop("Volunteers")
+        ].set_axis(single)
+        return found.join(properties)[
+            ["longitude", "latitude", "chapters", *columns]
+        ]
+
+
+def feature_collection(clusters: pd.DataFrame) -> dict:
+    """GeoJSON of ``ClusterIndex.clusters``: single chapters with their
+    properties, clusters with ``Chapters`` and ``Volunteers``
+    """
+    features = []
+    columns = clusters.columns.drop(["longitude", "latitude", "chapters"])
+    for row in clusters.to_dict("records"):
+        if row["chapters"] == 1:
+            properties = {name: row[name] for name in columns}
+        else:
+            properties = {
+                "Chapters": row["chapters"],
+                "Volunteers": row["Volunteers"],
+            }
+        features.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [row["longitude"], row["latitude"]],
+            },
+            "properties": properties,
+        })
+    return {"type": "FeatureCollection", "features": features}
@@ -0,0 +1,151 @@
+"""Pooled HTTP client for the portal's stats.json endpoint.
+
+Every caller (both dashboards and chapter_recode.py) goes through one
+``requests.Session`` so connections are kept alive, requests carry
+``If-None-Match``/``If-Modified-Since`` validators so an unchanged payload
+comes back as an empty 304, and transient failures are retried a bounded
+number of times with jittered exponential backoff. A ``Retry-After`` from
+the server is honoured only up to ``MAX_BACKOFF``: fetches hold the client
+lock, so a long one would stall every session. After repeated failed
+fetches a circuit breaker fails further calls immediately for a while, so
+a dead portal doesn't add latency to every refresh.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+STATS_URL = os.getenv(
+    "PYLADIES_STATS_URL", "https://portal.pyladies.com/stats.json"
+)
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 30)
+
+# Open the circuit after this many consecutive failed fetches, and keep it
+# open for this many seconds before letting a single trial fetch through
+FAILURE_THRESHOLD = 3
+RESET_AFTER = 60
+
+# Longest wait in seconds between retries, whatever Retry-After asks for
+MAX_BACKOFF = 10.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of fetching while the portal is considered down"""
+
+
+class _Retry(Retry):
+    """``Retry`` that waits at most ``backoff_max`` on a Retry-After too"""
+
+    def get_retry_after(self, response) -> float | None:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.backoff_max)
+
+
+@dataclass
+class StatsResponse:
+    """Parsed stats.json plus the raw bytes it was decoded from"""
+
+    payload: dict
+    content: bytes
+    not_modified: bool = False
+
+
+class StatsClient:
+    """Conditional, retrying GETs of a single JSON endpoint.
+
+    The last good body and its ``ETag``/``Last-Modified`` validators are
+    kept on the client; a 304 reply returns that cached body again.
+    """
+
+    def __init__(
+        self,
+        url=STATS_URL,
+        timeout=TIMEOUT,
+        retries=3,
+        failure_threshold=FAILURE_THRESHOLD,
+        reset_after=RESET_AFTER,
+        max_backoff=MAX_BACKOFF,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.session = requests.Session()
+        # gzip/deflate always, plus br/zstd when urllib3 can decode them
+        self.session.headers.update(make_headers(accept_encoding=True))
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=_Retry(
+                total=retries,
+                backoff_factor=0.5,
+                backoff_max=max_backoff,
+                backoff_jitter=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._last: StatsResponse | None = None
+        self._validators: dict[str, str] = {}
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    def fetch(self) -> StatsResponse:
+        """GET the endpoint, reusing the cached body on 304 Not Modified"""
+        with self._lock:
+            if (
+                self._opened_at is not None
+                and time.monotonic() - self._opened_at < self.reset_after
+            ):
+                raise CircuitOpenError(
+                    f"{self.url} failed {self._failures} times in a row"
+                )
+            try:
+                response = self._get()
+            except Exception:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+                raise
+            self._failures = 0
+            self._opened_at = None
+            return response
+
+    def _get(self) -> StatsResponse:
+        headers = dict(self._validators) if self._last else {}
+        response = self.session.get(
+            self.url, headers=headers, timeout=self.timeout
+        )
+        if response.status_code == 304 and self._last is not None:
+            return StatsResponse(
+                self._last.payload, self._last.content, not_modified=True
+            )
+        response.raise_for_status()
+
+        self._last = StatsResponse(response.json(), response.content)
+        self._validators = {}
+        if "ETag" in response.headers:
+            self._validators["If-None-Match"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            self._validators["If-Modified-Since"] = response.headers[
+                "Last-Modified"
+            ]
+        return self._last
+
+
+# Shared by everything in this process
+stats_client = StatsClient()
@@ -0,0 +1,379 @@
+"""Geocode the chapters in stats.json into ``chapter_geocoded.csv``.
+
+The pipeline runs in stages, each a function of the previous stage's
+output:
+
+- ``fetch``: volunteers by chapter from stats.json: the portal's, the
+  last one saved (``snapshot``) when offline, or a given file
+- ``normalize``: cluster variants of chapter names (``chapters``)
+- ``geocode``: coordinates for each cluster's name, abbreviations
+  expanded
+- ``standardize``: country from the coordinates (``countries``)
+- ``continent``: continent of that country
+- ``write``: the CSV and the chapter alias table
+
+``fetch``, ``normalize``, ``standardize`` and ``continent`` are
+checkpointed under ``PYLADIES_RECODE_CACHE``, keyed by a hash of their
+input and of the package's code and data, so a re-run reuses every stage
+whose input is unchanged. ``geocode`` has a finer checkpoint in the
+geocode cache (``geocache``), which keeps each answer as it arrives.
+Outputs replace the files atomically (``files.replace_file``), so a
+crash leaves the previous ones in place.
+
+Run it with::
+
+    python -m pyladies_dashboard.recode [--offline] [--force] [--stats PATH]
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from . import chapters, countries, snapshot
+from .data import CHAPTER_CSV
+from .files import replace_file
+from .gazetteer import load_gazetteer
+from .geocache import GeocodeCache
+from .geocode import Geocoder
+from .portal import stats_client
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = Path(
+    os.getenv(
+        "PYLADIES_RECODE_CACHE",
+        Path(__file__).resolve().parent.parent / ".cache" / "recode",
+    )
+)
+
+
+# checkpoints -----
+
+
+@functools.cache
+def _code_digest() -> bytes:
+    """Hash of the package's modules and bundled data"""
+    package = Path(__file__).resolve().parent
+    digest = hashlib.sha256()
+    for path in sorted([*package.glob("*.py"), *package.glob("geodata/*")]):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.digest()
+
+
+def _update(digest, value) -> None:
+    if isinstance(value, bytes):
+        digest.update(value)
+    elif isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+        hashes = pd.util.hash_pandas_object(value, index=False)
+        digest.update(hashes.to_numpy().tobytes())
+    elif isinstance(value, tuple):
+        for item in value:
+            _update(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+class Checkpoints:
+    """Stage outputs on disk, by a hash of the stage's inputs"""
+
+    def __init__(self, directory: Path = CHECKPOINT_DIR, force=False):
+        self.directory = Path(directory)
+        self.force = force
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def run(self, name: str, stage: Callable, *inputs):
+        """``stage(*inputs)``, or its output from an earlier run"""
+        digest = hashlib.sha256(_code_digest())
+        digest.update(name.encode())
+        _update(digest, inputs)
+        path = self.directory / f"{name}-{digest.hexdigest()[:16]}.pkl"
+        if path.exists() and not self.force:
+            logger.info("%s: input unchanged, reusing %s", name, path.name)
+            return pd.read_pickle(path)
+        output = stage(*inputs)
+        replace_file(path, lambda tmp: pd.to_pickle(output, tmp))
+        for old in self.directory.glob(f"{name}-*.pkl"):
+            if old != path:
+                old.unlink(missing_ok=True)
+        return output
+
+
+# stages -----
+
+
+def stats_content(stats: Path | None = None, offline: bool = False) -> bytes:
+    """stats.json: the file ``stats``, else the last snapshot if
+    ``offline``, else the portal's (which also updates the snapshot)
+    """
+    if stats is not None:
+        return Path(stats).read_bytes()
+    if offline:
+        saved = snapshot.read_snapshot()
+        if saved is None:
+            raise FileNotFoundError(
+                f"Offline and no stats snapshot in {snapshot.SNAPSHOT_DIR};"
+                " pass a stats.json file (--stats)"
+            )
+        content, fetched_at = saved
+        logger.info(
+            "Offline, using the stats snapshot from %s",
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(fetched_at)),
+        )
+        return content
+    content = stats_client.fetch().content
+    snapshot.write_snapshot(content, time.time())
+    return content
+
+
+def fetch(content: bytes) -> pd.DataFrame:
+    """``Chapter`` and ``Volunteers``, sorted by chapter"""
+    stats = json.loads(content)["stats"]
+    item = next(
+        item
+        for item in stats["volunteer_breakdown"]
+        if item["chart_id"] == "volunteer_by_chapter"
+    )
+    return (
+        pd
+        .DataFrame(item["data"], columns=item["columns"])
+        .sort_values("Chapter")
+        .reset_index(drop=True)
+    )
+
+
+def normalize(by_chapter: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """The alias table, and one row per chapter with its summed volunteers.
+
+    Variants of one chapter ("NYC", "New York City", "PyLadies NYC") are
+    clustered under a canonical ``chapter_key`` and shown under the name
+    of their biggest chapter, ``canonical``.
+    """
+    aliases = chapters.alias_table(
+        by_chapter["Chapter"], by_chapter["Volunteers"]
+    )
+    clusters = (
+        by_chapter
+        .merge(aliases, left_on="Chapter", right_on="chapter")
+        .groupby(["chapter_key", "canonical"], as_index=False)["Volunteers"]
+        .sum()
+        .sort_values("canonical", ignore_index=True)
+    )
+    return aliases, clusters
+
+
+def geocode(
+    clusters: pd.DataFrame,
+    cache: GeocodeCache,
+    api_key: str | None = None,
+    offline: bool = False,
+) -> pd.DataFrame:
+    """Coordinates and the geocoder's country for each chapter.
+
+    Each chapter is looked up by its name with abbreviations expanded
+    and punctuation kept (``chapters.expanded_name``: "Kuala Lumpur" for
+    "PyLadies KL", "Aba / Abia State" as it is), and cached by its
+    ``chapter_key``. Only chapters that are new or whose cached geocode
+    has expired are looked up: in the bundled gazetteer first, then the
+    ones it misses in the API unless ``offline``, concurrently at its
+    rate limit. Each answer is cached as it arrives; failures are
+    retried next run.
+    """
+    keys = clusters["chapter_key"]
+    queries = dict(
+        zip(clusters["canonical"].map(chapters.expanded_name), keys)
+    )
+    stale = set(cache.stale(keys))
+    todo = [query for query, key in queries.items() if key in stale]
+    logger.info("Geocoding %d of %d chapters", len(todo), len(clusters))
+
+    gazetteer = load_gazetteer()
+    misses = []
+    for query in todo:
+        result = gazetteer.geocode(query)
+        if result:
+            cache.put(queries[query], result, gazetteer.source)
+        else:
+            misses.append(query)
+    logger.info("%d found in the gazetteer", len(todo) - len(misses))
+
+    if misses and offline:
+        logger.warning("Offline, not looking up: %s", ", ".join(misses))
+    elif misses:
+        geocoder = Geocoder(api_key)
+        lookups = geocoder.geocode_many(misses)
+        for lookup in tqdm(lookups, total=len(misses)):
+            if lookup.error is None:
+                cache.put(
+                    queries[lookup.query], lookup.result, geocoder.source
+                )
+
+    lookups = cache.lookup(keys)
+    found = [lookups.get(key) or {} for key in keys]
+    return pd.DataFrame({
+        "chapter": clusters["canonical"],
+        "chapter_key": clusters["chapter_key"],
+        "volunteers": clusters["Volunteers"],
+        "country_geo": [r.get("country", "Not found") for r in found],
+        "latitude": [r.get("latitude") for r in found],
+        "longitude": [r.get("longitude") for r in found],
+    })
+
+
+def standardize(geocoded: pd.DataFrame) -> pd.DataFrame:
+    """``country`` in English, from the chapter's coordinates.
+
+    The country polygon a chapter falls in decides. The geocoder's
+    country ("Nederland", "臺灣") is used where no polygon holds the
+    point, e.g. places too small for the 1:110m outlines, and otherwise
+    only cross-checked: ``country_mismatch`` flags disagreements. Coastal
+    points cut off by the outlines take the nearest country last, and
+    places not found keep "Not found".
+    """
+    lon, lat = geocoded["longitude"], geocoded["latitude"]
+    in_polygon = countries.countries_at(lon, lat)
+    named = countries.iso_codes(geocoded["country_geo"])
+    near = countries.countries_at(lon, lat, countries.COAST_DISTANCE)
+    iso = in_polygon.fillna(named).fillna(near)
+    return geocoded.assign(
+        country=iso.map(countries.country_table()["name"]).fillna(
+            geocoded["country_geo"]
+        ),
+        country_mismatch=(
+            in_polygon.notna() & named.notna() & (in_polygon != named)
+        ),
+    )
+
+
+def continent(standardized: pd.DataFrame) -> pd.DataFrame:
+    """``continent`` of each chapter's country, or "Unknown" """
+    located = standardized.assign(
+        continent=countries.continents(standardized["country"]).fillna(
+            "Unknown"
+        )
+    )
+    # the CSV's columns, in their order
+    return located[
+        [
+            "chapter",
+            "chapter_key",
+            "volunteers",
+            "country_geo",
+            "latitude",
+            "longitude",
+            "country",
+            "continent",
+            "country_mismatch",
+        ]
+    ]
+
+
+def write(
+    located: pd.DataFrame,
+    aliases: pd.DataFrame,
+    output: Path = CHAPTER_CSV,
+    aliases_output: Path = chapters.CHAPTER_ALIASES_CSV,
+) -> None:
+    """Save the chapters and the alias table the dashboards merge them by"""
+    replace_file(output, lambda tmp: located.to_csv(tmp, index=False))
+    replace_file(aliases_output, lambda tmp: aliases.to_csv(tmp, index=False))
+
+
+def run(
+    api_key: str | None = None,
+    offline: bool = False,
+    force: bool = False,
+    output: Path = CHAPTER_CSV,
+    aliases_output: Path | None = None,
+    stats: Path | None = None,
+) -> pd.DataFrame:
+    """Every stage, reusing checkpoints unless ``force``.
+
+    The alias table goes to ``aliases_output``, by default next to
+    ``output``.
+    """
+    checkpoints = Checkpoints(force=force)
+    by_chapter = checkpoints.run("fetch", fetch, stats_content(stats, offline))
+    aliases, clusters = checkpoints.run("normalize", normalize, by_chapter)
+    logger.info(
+        "%d chapter names, %d chapters", len(by_chapter), len(clusters)
+    )
+    cache = GeocodeCache()
+    try:
+        geocoded = geocode(clusters, cache, api_key, offline)
+    finally:
+        cache.close()
+    standardized = checkpoints.run("standardize", standardize, geocoded)
+    for _, row in standardized[standardized["country_mismatch"]].iterrows():
+        logger.warning(
+            "%s: geocoded in %s, located in %s",
+            row["chapter"],
+            row["country_geo"],
+            row["country"],
+        )
+    located = checkpoints.run("continent", continent, standardized)
+    if aliases_output is None:
+        aliases_output = output.parent / chapters.CHAPTER_ALIASES_CSV.name
+    write(located, aliases, output, aliases_output)
+    return located
+
+
+def main(argv=None) -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        prog="python -m pyladies_dashboard.recode",
+        description="Geocode the chapters in stats.json.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=os.getenv("PYLADIES_GEOCODE_OFFLINE", "") not in ("", "0"),
+        help="no network access: stats from the last snapshot and"
+        " coordinates from the bundled gazetteer, e.g. in CI"
+        " (PYLADIES_GEOCODE_OFFLINE)",
+    )
+    parser.add_argument(
+        "--stats",
+        type=Path,
+        help="stats.json to read instead of fetching it",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="re-run every stage"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=CHAPTER_CSV,
+        help=f"CSV to write (default {CHAPTER_CSV.name})",
+    )
+    parser.add_argument(
+        "--aliases-output",
+        type=Path,
+        help="alias table to write (default"
+        f" {chapters.CHAPTER_ALIASES_CSV.name} next to --output)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run(
+        os.getenv("GEOCODE_API_KEY"),
+        args.offline,
+        args.force,
+        args.output,
+        args.aliases_output,
+        args.stats,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Scheduled in-process refresh of the portal stats.
+
+Rather than redeploying the dashboards to pick up a new stats.json, one
+daemon thread per process refetches it every ``REFRESH_INTERVAL`` seconds
+and swaps it into the data layer. Each session watches the cached version
+with ``reactive.poll``, which only reads memory, so connected sessions
+re-render within ``POLL_INTERVAL`` seconds of a change.
+
+Admins also see the chart render queue in the status footer, updated
+every ``QUEUE_INTERVAL`` seconds, when the app passes its
+``plots.render_executor``.
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+from shiny import reactive, render, ui
+from shiny.express import module
+
+from . import data
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.getenv("PYLADIES_REFRESH_INTERVAL", "300"))
+POLL_INTERVAL = float(os.getenv("PYLADIES_POLL_INTERVAL", "5"))
+QUEUE_INTERVAL = 5
+
+# Visiting a dashboard with ?admin=<token> shows a "Refresh now" button
+ADMIN_TOKEN = os.getenv("PYLADIES_ADMIN_TOKEN", "")
+
+_lock = threading.Lock()
+_thread: threading.Thread | None = None
+
+
+def _run(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            data.refresh_stats()
+        except Exception as e:
+            logger.warning("Scheduled stats refresh failed: %s", e)
+
+
+def start_scheduler(interval: float = REFRESH_INTERVAL) -> None:
+    """Start the refresh thread, once per process"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_run,
+                args=(interval,),
+                name="stats-refresh",
+                daemon=True,
+            )
+            _thread.start()
+
+
+def stats_poll():
+    """Reactive StatsData for the current session.
+
+    Call it while a session is running (i.e. from the app file); it
+    invalidates whenever the scheduler swaps in a new version.
+    """
+
+    # Load the stats first so the poll's initial version is the real one,
+    # not "" (which would invalidate every output on the first tick)
+    data.get_stats_data()
+
+    @reactive.poll(data.current_version, POLL_INTERVAL)
+    def stats_data():
+        return data.get_stats_data()
+
+    return stats_data
+
+
+def _format_age(seconds: float) -> str:
+    if seconds < 90:
+        return "just now"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} min ago"
+    return f"{seconds / 3600:.1f} h ago"
+
+
+@module
+def refresh_status(input, output, session, stats_data, render_executor=None):
+    """Data age footer, with a force-refresh button and the queue of
+    ``render_executor`` (a ``plots.RenderExecutor``) for admins
+    """
+
+    def is_admin() -> bool:
+        query = parse_qs(session.clientdata.url_search().lstrip("?"))
+        token = query.get("admin", [""])[0]
+        return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+    @render.ui
+    def last_refreshed():
+        reactive.invalidate_later(30)
+        stats_data()
+        text = f"Data refreshed {_format_age(data.staleness())}"
+        if data.last_error is None:
+            return ui.tags.small(text, class_="text-muted")
+        return ui.tags.small(
+            f"{text}; the stats portal is unreachable, so this may be "
+            "out of date",
+            class_="text-warning",
+        )
+
+    @render.ui
+    def admin_controls():
+        if not is_admin():
+            return None
+        return ui.input_action_button(
+            "refresh_now", "Refresh now", class_="btn-sm"
+        )
+
+    @render.ui
+    def render_queue():
+        if (
+            render_executor is None
+            or not render_executor.enabled
+            or not is_admin()
+        ):
+            return None
+        reactive.invalidate_later(QUEUE_INTERVAL)
+        return ui.tags.small(
+            f"Render queue depth: {render_executor.queue_depth}"
+            f" ({render_executor.workers} workers)",
+            class_="text-muted",
+        )
+
+    @reactive.effect
+    @reactive.event(input.refresh_now)
+    async def _():
+        try:
+            await asyncio.to_thread(data.refresh_stats)
+        except Exception as e:
+            ui.notification_show(f"Refresh failed: {e}", type="error")
+        else:
+            ui.notification_show("Stats refreshed")
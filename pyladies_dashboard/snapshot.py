@@ -0,0 +1,44 @@
+"""Last-known-good copy of stats.json on disk.
+
+Every successful fetch is written here atomically (temp file, fsync,
+rename), with the file's mtime set to when the portal last confirmed it.
+A new worker starts from this file instantly instead of waiting on the
+portal, and keeps working from it if the portal is down.
+"""
+
+import os
+from pathlib import Path
+
+from .files import replace_file
+
+SNAPSHOT_DIR = Path(
+    os.getenv(
+        "PYLADIES_SNAPSHOT_DIR",
+        Path(__file__).resolve().parent.parent / ".cache" / "snapshots",
+    )
+)
+SNAPSHOT_FILE = "stats.json"
+
+
+def write_snapshot(content: bytes, fetched_at: float) -> Path:
+    """Atomically replace the snapshot with ``content``"""
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOT_DIR / SNAPSHOT_FILE
+    replace_file(path, lambda tmp: tmp.write_bytes(content), fetched_at)
+    return path
+
+
+def touch_snapshot(fetched_at: float) -> None:
+    """Record that the portal re-confirmed the snapshot (e.g. a 304)"""
+    path = SNAPSHOT_DIR / SNAPSHOT_FILE
+    if path.exists():
+        os.utime(path, (fetched_at, fetched_at))
+
+
+def read_snapshot() -> tuple[bytes, float] | None:
+    """The snapshot's bytes and when they were fetched, if there is one"""
+    path = SNAPSHOT_DIR / SNAPSHOT_FILE
+    try:
+        return path.read_bytes(), path.stat().st_mtime
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,386 @@
+"""Charts for the sponsor dashboard.
+
+The plotnine figures live here, rather than in the app file, so a render
+worker process can import them (see ``plots.PlotJob``); each one takes the
+frames it draws and returns an unrendered ``ggplot``.
+
+With ``PYLADIES_SPONSOR_CHARTS=vega`` the dashboard instead sends the
+Vega-Lite equivalents from ``vega_charts()`` and the browser draws and
+resizes them. They are built once per data version and carry the few rows
+they plot inline, so a session costs a few KB of JSON per chart.
+
+Every chart takes the page color mode, ``"light"`` or ``"dark"``, as its
+last argument.
+"""
+
+import functools
+import os
+
+import altair as alt
+import numpy as np
+import pandas as pd
+from mizani.palettes import hue_pal
+from plotnine import (
+    ggplot,
+    aes,
+    geom_bar,
+    geom_col,
+    geom_text,
+    labs,
+    coord_flip,
+    scale_y_continuous,
+    scale_fill_manual,
+    theme_tufte,
+    theme,
+    element_blank,
+    element_rect,
+    element_text,
+)
+
+from . import data
+
+# "png" (server-rendered plotnine) or "vega" (drawn in the browser)
+CHART_MODE = os.getenv("PYLADIES_SPONSOR_CHARTS", "png")
+
+# Chart colors by page color mode: light keeps the plotting libraries'
+# defaults, dark follows Shiny's dark Bootstrap theme
+COLORS = {
+    "light": {
+        "text": "black",
+        "axis": "#4D4D4D",
+        "background": "white",
+        "legend": "white",
+    },
+    "dark": {
+        "text": "#dee2e6",
+        "axis": "#adb5bd",
+        "background": "#1d1f21",
+        "legend": "#343a46",
+    },
+}
+
+
+# plotnine -----
+
+
+def _mode_theme(mode: str) -> theme:
+    """Text and background colors for ``mode``, over theme_tufte()"""
+    if mode == "light":
+        return theme()
+    colors = COLORS[mode]
+    return theme(
+        text=element_text(color=colors["text"]),
+        axis_text=element_text(color=colors["axis"]),
+        plot_background=element_rect(
+            fill=colors["background"], color=colors["background"]
+        ),
+    )
+
+
+def funding_goal(funding_goal, mode="light"):
+    return (
+        ggplot(
+            funding_goal,
+            aes(x=1, y="amount", fill="segment"),
+        )
+        + geom_col(stat="identity", position="stack")
+        + scale_fill_manual(
+            breaks=["goal", "stretch"],
+            labels=["Goal", "Stretch"],  # title case labels
+            values={"goal": "skyblue", "stretch": "gold"},
+        )
+        + scale_y_continuous(labels=lambda l: [f"${int(v):,}" for v in l])
+        + labs(x="", y="")
+        + coord_flip()
+        + theme_tufte()
+        + _mode_theme(mode)
+        + theme(
+            axis_ticks=element_blank(),
+            axis_text_y=element_blank(),
+            legend_background=element_rect(
+                fill=COLORS[mode]["legend"], alpha=0.8, color="gray"
+            ),
+            # top-right corner, normalized coordinates
+            legend_position=(0.95, 0.95),
+            # align legend top-right to the position
+            legend_justification=(1, 1),
+            legend_title=element_blank(),
+        )
+    )
+
+
+def amount_paid(
+    paid_funding, sponsorship_paid, sponsorship_paid_pct, mode="light"
+):
+    return (
+        ggplot()
+        + geom_col(
+            paid_funding,
+            aes(x=1, y="amount", fill="segment"),
+            stat="identity",
+            position="stack",
+        )
+        + geom_text(
+            pd.DataFrame({
+                "x": [1],
+                "y": [sponsorship_paid / 2],
+                "label": [f"{sponsorship_paid_pct:.0f}% Paid"],
+            }),
+            aes(x="x", y="y", label="label"),
+            color="white",
+            size=10,
+            ha="center",
+            va="center",
+            fontweight="bold",
+        )
+        + scale_fill_manual(
+            values={"paid": "green", "total": "lightgrey"},
+        )
+        + scale_y_continuous(labels=lambda l: [f"${int(v):,}" for v in l])
+        + labs(x="", y="")
+        + coord_flip()
+        + theme_tufte()
+        + _mode_theme(mode)
+        + theme(
+            axis_ticks=element_blank(),
+            axis_text_y=element_blank(),
+            legend_position="none",
+        )
+    )
+
+
+def sponsor_status(sponsor_status, mode="light"):
+    return (
+        ggplot(
+            sponsor_status,
+            aes(x="reorder(status, count)", y="count", fill="status"),
+        )
+        + geom_bar(stat="identity")
+        + geom_text(
+            aes(
+                label=sponsor_status.apply(
+                    lambda r: f"{r['count']} ({r['percent']:.0f}%)",
+                    axis=1,
+                )
+            ),
+            ha="left",
+            nudge_y=0.5,  # move text slightly right of the bar
+            size=9,
+            color=COLORS[mode]["text"],
+        )
+        + scale_y_continuous(
+            expand=(0, 0),
+            limits=(0, sponsor_status["count"].max() + 7),
+            breaks=lambda x: np.arange(
+                0, sponsor_status["count"].max() + 1, 10
+            ),
+        )
+        + labs(x="", y="")
+        + coord_flip()
+        + theme_tufte()
+        + _mode_theme(mode)
+        + theme(
+            legend_position="none",
+            axis_text_y=element_text(
+                va="center",
+                ha="right",
+                linespacing=1.5,
+            ),
+        )
+    )
+
+
+def sponsor_tier(sponsor_tier, mode="light"):
+    return (
+        ggplot(
+            sponsor_tier,
+            aes(x="reorder(tier, count)", y="count", fill="tier"),
+        )
+        + geom_bar(stat="identity")
+        + geom_text(
+            aes(
+                label=sponsor_tier.apply(
+                    lambda r: f"{r['count']} ({r['percent']:.0f}%)",
+                    axis=1,
+                )
+            ),
+            ha="left",
+            nudge_y=0.1,  # move text slightly right of the bar
+            size=9,
+            color=COLORS[mode]["text"],
+        )
+        + scale_y_continuous(
+            expand=(0, 0),
+            limits=(0, sponsor_tier["count"].max() + 2),
+            breaks=lambda x: np.arange(0, sponsor_tier["count"].max() + 1, 1),
+        )
+        + labs(x="", y="")
+        + coord_flip()
+        + theme_tufte()
+        + _mode_theme(mode)
+        + theme(
+            legend_position="none",
+        )
+    )
+
+
+# Vega-Lite -----
+
+_MONEY = alt.Axis(format="$,d", title=None, ticks=False, domain=False)
+
+
+def _minimal(chart: alt.Chart, mode: str) -> alt.Chart:
+    # Roughly theme_tufte(): no grid, axis lines or panel border. Filling
+    # the output container lets the browser handle every resize
+    axis = {"grid": False, "domain": False, "labelFontSize": 11}
+    chart = chart.properties(width="container", height="container")
+    if mode != "light":
+        colors = COLORS[mode]
+        axis["labelColor"] = colors["axis"]
+        chart = (
+            chart
+            .configure(background=colors["background"])
+            .configure_legend(labelColor=colors["text"])
+            .configure_text(color=colors["text"])
+        )
+    return chart.configure_view(strokeWidth=0).configure_axis(**axis)
+
+
+def _stacked_bar(frame, colors: dict[str, str], legend=None) -> alt.Chart:
+    # Stack in the order of ``colors``, first segment from zero
+    order = {segment: i for i, segment in enumerate(colors)}
+    return (
+        alt
+        .Chart(frame.assign(order=frame["segment"].map(order).astype(int)))
+        .mark_bar()
+        .encode(
+            x=alt.X("sum(amount):Q", stack="zero", axis=_MONEY),
+            color=alt.Color(
+                "segment:N",
+                scale=alt.Scale(
+                    domain=list(colors), range=list(colors.values())
+                ),
+                legend=legend,
+            ),
+            order=alt.Order("order:Q"),
+            tooltip=["segment:N", alt.Tooltip("amount:Q", format="$,.0f")],
+        )
+    )
+
+
+def funding_goal_spec(funding_goal, mode="light") -> alt.Chart:
+    legend = alt.Legend(
+        title=None,
+        orient="top-right",
+        fillColor=COLORS[mode]["legend"],
+        strokeColor="gray",
+        padding=6,
+        # title case labels
+        labelExpr="upper(slice(datum.label, 0, 1)) + slice(datum.label, 1)",
+    )
+    return _minimal(
+        _stacked_bar(
+            funding_goal, {"goal": "skyblue", "stretch": "gold"}, legend
+        ),
+        mode,
+    )
+
+
+def amount_paid_spec(
+    paid_funding, sponsorship_paid, sponsorship_paid_pct, mode="light"
+) -> alt.Chart:
+    bars = _stacked_bar(paid_funding, {"paid": "green", "total": "lightgrey"})
+    label = (
+        alt
+        .Chart(
+            pd.DataFrame({
+                "x": [sponsorship_paid / 2],
+                "label": [f"{sponsorship_paid_pct:.0f}% Paid"],
+            })
+        )
+        .mark_text(color="white", fontSize=13, fontWeight="bold")
+        .encode(x="x:Q", text="label:N")
+    )
+    return _minimal(alt.layer(bars, label), mode)
+
+
+def _count_bars(
+    frame, field: str, nudge: float, pad: int, step: int, mode: str
+):
+    """Horizontal bars of ``count`` per ``field``, largest on top"""
+    levels = sorted(frame[field].unique())
+    top = int(frame["count"].max())
+    frame = frame.assign(
+        label=[
+            f"{c} ({p:.0f}%)" for c, p in zip(frame["count"], frame["percent"])
+        ],
+        label_x=frame["count"] + nudge,
+    )
+    y = alt.Y(
+        f"{field}:N",
+        sort=alt.EncodingSortField("count", order="descending"),
+        title=None,
+        # Category names carry "\n" for two-line labels
+        axis=alt.Axis(labelExpr="split(datum.label, '\\n')", ticks=False),
+    )
+    bars = (
+        alt
+        .Chart(frame)
+        .mark_bar()
+        .encode(
+            x=alt.X(
+                "count:Q",
+                title=None,
+                scale=alt.Scale(domain=[0, top + pad], nice=False),
+                axis=alt.Axis(values=list(range(0, top + 1, step))),
+            ),
+            y=y,
+            color=alt.Color(
+                f"{field}:N",
+                scale=alt.Scale(domain=levels, range=hue_pal()(len(levels))),
+                legend=None,
+            ),
+            tooltip=[f"{field}:N", "count:Q"],
+        )
+    )
+    text = (
+        alt
+        .Chart(frame)
+        .mark_text(align="left", fontSize=12)
+        .encode(x="label_x:Q", y=y, text="label:N")
+    )
+    return _minimal(alt.layer(bars, text), mode)
+
+
+def sponsor_status_spec(sponsor_status, mode="light") -> alt.Chart:
+    return _count_bars(
+        sponsor_status, "status", nudge=0.5, pad=7, step=10, mode=mode
+    )
+
+
+def sponsor_tier_spec(sponsor_tier, mode="light") -> alt.Chart:
+    return _count_bars(
+        sponsor_tier, "tier", nudge=0.1, pad=2, step=1, mode=mode
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def vega_charts(
+    stats: data.StatsData, mode: str = "light"
+) -> dict[str, alt.Chart]:
+    """Vega-Lite versions of the four charts, per data version and mode"""
+    frames = data.sponsor_frames(stats)
+    totals = data.sponsor_totals(stats)
+    return {
+        "plot_goal": funding_goal_spec(frames["funding_goal"], mode),
+        "plot_paid": amount_paid_spec(
+            frames["paid_funding"],
+            totals["sponsorship_paid"],
+            totals["sponsorship_paid_pct"],
+            mode,
+        ),
+        "plot_sponsor_status": sponsor_status_spec(
+            frames["sponsor_status"], mode
+        ),
+        "plot_sponsor_tier": sponsor_tier_spec(frames["sponsor_tier"], mode),
+    }
@@ -0,0 +1,88 @@
+"""Content-hashed files for the static routes (``/tiles``, ``/assets``).
+
+Map sources are published as files named after a hash of their content
+and referenced by URL, so browsers fetch and cache them over HTTP instead
+of receiving the data in every session's websocket messages.
+
+Shiny serves the directories with Starlette's StaticFiles, which derives
+``ETag`` and ``Last-Modified`` from the file's mtime and size. Neither
+``App`` nor ``app_opts`` offers a way to add ``Cache-Control`` to those
+routes, so the files rely on heuristic freshness (RFC 9111, 4.2.2)
+instead. Each published file gets an mtime computed from its content
+hash, within the year after ``EPOCH``:
+
+* every worker and replica sends the same ETag for the same bytes, so a
+  revalidation gets its 304 wherever it lands;
+* the Last-Modified date is years old, and browsers keep a response
+  without explicit freshness for a tenth of its age (some cap that at a
+  week), so they reuse the file for a long time before revalidating.
+
+How long is up to each cache, and some always revalidate. Behind a
+reverse proxy, set ``Cache-Control: public, max-age=31536000, immutable``
+on ``/tiles`` and ``/assets`` to make it explicit; the names change with
+the content, so that is always safe.
+
+Superseded versions are pruned once they are ``PRUNE_AFTER`` seconds old,
+always keeping the newest ``KEEP_VERSIONS``, so sessions still on an
+older version can finish loading its tiles.
+"""
+
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from .files import replace_file
+
+EPOCH = 946684800  # 2000-01-01
+KEEP_VERSIONS = 3
+PRUNE_AFTER = 24 * 3600
+
+
+def publish(
+    directory: Path,
+    name: str,
+    suffix: str,
+    digest: str,
+    write: Callable[[Path], None],
+) -> str:
+    """Write ``name.<hash><suffix>`` with ``write(tmp_path)``, if missing.
+
+    Returns the file name; identical content is written once.
+    """
+    filename = f"{name}.{digest[:12]}{suffix}"
+    path = directory / filename
+    if path.exists():
+        return filename
+
+    stamp = EPOCH + int(digest[:8], 16) % (365 * 24 * 3600)
+    directory.mkdir(parents=True, exist_ok=True)
+    replace_file(path, write, stamp)
+    prune(directory, name, suffix)
+    return filename
+
+
+def prune(
+    directory: Path,
+    name: str,
+    suffix: str,
+    keep: int = KEEP_VERSIONS,
+    older_than: float = PRUNE_AFTER,
+) -> None:
+    """Delete old versions of ``name``, keeping the ``keep`` newest"""
+    pattern = re.compile(
+        rf"{re.escape(name)}\.[0-9a-f]{{12}}{re.escape(suffix)}"
+    )
+    versions = []
+    for path in directory.iterdir():
+        if pattern.fullmatch(path.name):
+            try:
+                # mtime is synthetic; ctime is when the file was published
+                versions.append((path.stat().st_ctime, path))
+            except FileNotFoundError:
+                continue
+    versions.sort(reverse=True)
+    cutoff = time.time() - older_than
+    for published, path in versions[keep:]:
+        if published < cutoff:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,388 @@
+"""Local vector tiles for the map overlays.
+
+Instead of shipping whole GeoJSON documents through the maplibre widget,
+the overlays are cut into Mapbox Vector Tiles and packed into a single
+PMTiles archive per data version. The archives are written to
+``TILES_DIR`` under a content-hashed name and served as static files, so
+browsers range-request only the tiles in view and cache them over HTTP.
+
+Register the directory in an Express app, with the assets one, by::
+
+    app_opts(static_assets=assets.static_assets())
+
+and point a maplibre ``vector`` source at ``tiles.source_url(name)``.
+"""
+
+import functools
+import gzip
+import hashlib
+import math
+import os
+import struct
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pmtiles.tile import Compression, TileType, zxy_to_tileid
+from pmtiles.writer import write
+
+from . import static
+
+TILES_DIR = Path(
+    os.getenv(
+        "PYLADIES_TILES_DIR",
+        Path(__file__).resolve().parent.parent / ".cache" / "tiles",
+    )
+)
+TILES_ROUTE = "/tiles"
+
+EXTENT = 4096
+# Tile-edge overlap (in tile units) so clipped polygons don't show seams
+BUFFER = 64
+MAX_ZOOM = 5
+
+# Web Mercator bounds
+WORLD = 20037508.342789244
+MAX_LAT = 85.0511287798066
+
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+_POINT, _LINESTRING, _POLYGON = 1, 2, 3
+
+
+# protobuf -----
+
+
+def _encode_varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+# Every value up to two varint bytes, which covers zigzagged tile
+# coordinates and tag indexes, the bulk of what gets encoded
+_SMALL_VARINTS = [_encode_varint(n) for n in range(2**14)]
+
+
+def _varint(n: int) -> bytes:
+    if n < 2**14:
+        return _SMALL_VARINTS[n]
+    return _encode_varint(n)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    # length-delimited (wire type 2)
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values) -> bytes:
+    return _field(number, b"".join(map(_varint, values)))
+
+
+def _value(v) -> bytes:
+    # Keyed on the type too, so True, 1 and 1.0 stay distinct
+    return _typed_value(type(v), v)
+
+
+@functools.lru_cache(maxsize=2**16)
+def _typed_value(_, v) -> bytes:
+    if isinstance(v, (bool, np.bool_)):
+        return _varint(7 << 3) + _varint(int(v))
+    if isinstance(v, (int, np.integer)):
+        return _varint(6 << 3) + _varint(_zigzag(int(v)))
+    if isinstance(v, (float, np.floating)):
+        return _varint(3 << 3 | 1) + struct.pack("<d", float(v))
+    return _field(1, str(v).encode())
+
+
+# geometry -----
+
+
+def _command(cmd: int, count: int) -> int:
+    return (count << 3) | cmd
+
+
+def _encode_points(coords, cursor):
+    out = [_command(_MOVE_TO, len(coords))]
+    for x, y in coords:
+        out += [_zigzag(x - cursor[0]), _zigzag(y - cursor[1])]
+        cursor = (x, y)
+    return out, cursor
+
+
+def _encode_ring(coords, cursor):
+    # Drop the closing vertex and repeated vertices left by rounding
+    ring = [coords[0]]
+    for xy in coords[1:-1]:
+        if xy != ring[-1]:
+            ring.append(xy)
+    if len(ring) < 3:
+        return [], cursor
+    x, y = ring[0]
+    out = [
+        _command(_MOVE_TO, 1),
+        _zigzag(x - cursor[0]),
+        _zigzag(y - cursor[1]),
+        _command(_LINE_TO, len(ring) - 1),
+    ]
+    cursor = (x, y)
+    for x, y in ring[1:]:
+        out += [_zigzag(x - cursor[0]), _zigzag(y - cursor[1])]
+        cursor = (x, y)
+    out.append(_command(_CLOSE_PATH, 1))
+    return out, cursor
+
+
+def _encode_geometry(geom) -> tuple[int, list[int]]:
+    """MVT type and command stream for a geometry in integer tile units"""
+    cursor = (0, 0)
+    if geom.geom_type in ("Point", "MultiPoint"):
+        coords = [tuple(map(int, c)) for c in shapely.get_coordinates(geom)]
+        out, _ = _encode_points(coords, cursor)
+        return _POINT, out
+
+    out = []
+    # MVT exterior rings have a positive shoelace area in y-down tile
+    # coordinates, which is what shapely calls counter-clockwise
+    geom = shapely.orient_polygons(geom, exterior_cw=False)
+    for polygon in shapely.get_parts(geom):
+        if polygon.geom_type != "Polygon":
+            continue
+        for ring in [polygon.exterior, *polygon.interiors]:
+            coords = [tuple(map(int, c)) for c in ring.coords]
+            commands, cursor = _encode_ring(coords, cursor)
+            out += commands
+    return _POLYGON, out
+
+
+def _encode_properties(properties: dict) -> list[tuple[str, bytes]]:
+    """``(key, encoded value)`` pairs, skipping missing values"""
+    return [
+        (key, _value(value))
+        for key, value in properties.items()
+        if value is not None
+        and not (isinstance(value, float) and math.isnan(value))
+    ]
+
+
+_FEATURE_ID = _varint(1 << 3)
+_FEATURE_TYPE = _varint(3 << 3)
+
+
+def _encode_layer(name: str, features) -> bytes:
+    """MVT layer from ``(id, geom_type, commands, properties)`` tuples.
+
+    ``properties`` come from ``_encode_properties``.
+    """
+    keys, values = {}, {}
+    encoded = []
+    for feature_id, geom_type, commands, properties in features:
+        if not commands:
+            continue
+        tags = []
+        for key, value_bytes in properties:
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(value_bytes, len(values)))
+        encoded.append(
+            _FEATURE_ID
+            + _varint(feature_id)
+            + _packed(2, tags)
+            + _FEATURE_TYPE
+            + _varint(geom_type)
+            + _packed(4, commands)
+        )
+    if not encoded:
+        return b""
+    layer = (
+        _varint(15 << 3)
+        + _varint(2)
+        + _field(1, name.encode())
+        + b"".join(_field(2, f) for f in encoded)
+        + b"".join(_field(3, k.encode()) for k in keys)
+        + b"".join(_field(4, v) for v in values)
+        + _varint(5 << 3)
+        + _varint(EXTENT)
+    )
+    return _field(3, layer)
+
+
+# tiling -----
+
+
+def _to_mercator(gdf: gpd.GeoDataFrame) -> np.ndarray:
+    geoms = shapely.clip_by_rect(
+        gdf.to_crs("EPSG:4326").geometry.values, -180, -MAX_LAT, 180, MAX_LAT
+    )
+    return gpd.GeoSeries(geoms, crs="EPSG:4326").to_crs("EPSG:3857").to_numpy()
+
+
+def _tile_range(bounds, z):
+    n = 2**z
+    size = 2 * WORLD / n
+
+    def clamp(v):
+        return min(max(int(v), 0), n - 1)
+
+    minx, miny, maxx, maxy = bounds
+    return (
+        range(clamp((minx + WORLD) / size), clamp((maxx + WORLD) / size) + 1),
+        range(clamp((WORLD - maxy) / size), clamp((WORLD - miny) / size) + 1),
+    )
+
+
+def build_tiles(
+    layers: dict[str, gpd.GeoDataFrame], max_zoom: int = MAX_ZOOM
+) -> dict[tuple[int, int, int], bytes]:
+    """Encode ``layers`` as MVT tiles for zooms 0 to ``max_zoom``.
+
+    Every column other than the geometry becomes a feature property.
+    Returns uncompressed tiles keyed by ``(z, x, y)``, skipping empty ones.
+    """
+    prepared = []
+    for name, gdf in layers.items():
+        geoms = _to_mercator(gdf)
+        keep = ~shapely.is_empty(geoms)
+        properties = [
+            _encode_properties(record)
+            for record in gdf.drop(columns=gdf.geometry.name)[keep].to_dict(
+                "records"
+            )
+        ]
+        geoms = geoms[keep]
+        prepared.append((name, geoms, shapely.STRtree(geoms), properties))
+
+    tiles = {}
+    for z in range(max_zoom + 1):
+        size = 2 * WORLD / 2**z
+        pad = size * BUFFER / EXTENT
+        coords = set()
+        for _, geoms, _, _ in prepared:
+            bounds = shapely.total_bounds(geoms)
+            if not np.isnan(bounds).any():
+                xs, ys = _tile_range(bounds, z)
+                coords.update((x, y) for x in xs for y in ys)
+
+        for x, y in coords:
+            minx = -WORLD + x * size
+            maxy = WORLD - y * size
+            box = (
+                minx - pad,
+                maxy - size - pad,
+                minx + size + pad,
+                maxy + pad,
+            )
+            data = b""
+            for name, geoms, tree, properties in prepared:
+                hits = tree.query(shapely.box(*box))
+                if not len(hits):
+                    continue
+                clipped = shapely.clip_by_rect(geoms[hits], *box)
+                local = shapely.transform(
+                    clipped,
+                    lambda xy, minx=minx, maxy=maxy, size=size: np.round(
+                        np.column_stack((
+                            (xy[:, 0] - minx) / size * EXTENT,
+                            (maxy - xy[:, 1]) / size * EXTENT,
+                        ))
+                    ),
+                )
+                data += _encode_layer(
+                    name,
+                    (
+                        (int(i) + 1, *_encode_geometry(g), properties[i])
+                        for i, g in zip(hits, local)
+                        if not g.is_empty
+                    ),
+                )
+            if data:
+                tiles[z, x, y] = data
+    return tiles
+
+
+def _write_archive(
+    path: Path,
+    tiles: dict[tuple[int, int, int], bytes],
+    layers: dict[str, gpd.GeoDataFrame],
+    max_zoom: int,
+) -> None:
+    bounds = np.array([
+        gdf.to_crs("EPSG:4326").total_bounds for gdf in layers.values()
+    ])
+    minx, miny = np.nanmin(bounds[:, :2], axis=0)
+    maxx, maxy = np.nanmax(bounds[:, 2:], axis=0)
+    with write(path) as writer:
+        for (z, x, y), data in sorted(
+            tiles.items(), key=lambda item: zxy_to_tileid(*item[0])
+        ):
+            writer.write_tile(zxy_to_tileid(z, x, y), gzip.compress(data))
+        writer.finalize(
+            {
+                "tile_type": TileType.MVT,
+                "tile_compression": Compression.GZIP,
+                "min_lon_e7": int(minx * 1e7),
+                "min_lat_e7": int(max(miny, -MAX_LAT) * 1e7),
+                "max_lon_e7": int(maxx * 1e7),
+                "max_lat_e7": int(min(maxy, MAX_LAT) * 1e7),
+                "center_zoom": 0,
+                "center_lon_e7": int((minx + maxx) / 2 * 1e7),
+                "center_lat_e7": int((miny + maxy) / 2 * 1e7),
+            },
+            {
+                "vector_layers": [
+                    {
+                        "id": layer,
+                        "minzoom": 0,
+                        "maxzoom": max_zoom,
+                        "fields": {
+                            c: "String" if gdf[c].dtype == object else "Number"
+                            for c in gdf.columns
+                            if c != gdf.geometry.name
+                        },
+                    }
+                    for layer, gdf in layers.items()
+                ]
+            },
+        )
+
+
+def write_pmtiles(
+    name: str, layers: dict[str, gpd.GeoDataFrame], max_zoom: int = MAX_ZOOM
+) -> str:
+    """Write ``layers`` to a content-hashed PMTiles archive in TILES_DIR.
+
+    Returns the archive's file name; identical content is written once.
+    Tiles are stored gzipped, the encoding maplibre's PMTiles protocol
+    expects, so nothing is compressed per request.
+    """
+    tiles = build_tiles(layers, max_zoom)
+    digest = hashlib.sha256()
+    for key in sorted(tiles):
+        digest.update(repr(key).encode() + tiles[key])
+    return static.publish(
+        TILES_DIR,
+        name,
+        ".pmtiles",
+        digest.hexdigest(),
+        functools.partial(
+            _write_archive, tiles=tiles, layers=layers, max_zoom=max_zoom
+        ),
+    )
+
+
+def source_url(filename: str) -> str:
+    """maplibre ``vector`` source URL for an archive from write_pmtiles()
+
+    The path is relative so it keeps working when the app is hosted under
+    a URL prefix.
+    """
+    return f"pmtiles://{TILES_ROUTE.lstrip('/')}/{filename}"
@@ -0,0 +1,40 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+
+class LocalServer(ThreadingHTTPServer):
+    """Stand-in HTTP server on a free local port. Handlers record what
+    they see in ``requests``, under ``lock``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, handler):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.lock = threading.Lock()
+        self.requests = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+@pytest.fixture
+def serve():
+    """Start a ``LocalServer`` for a handler class; shut down after the
+    test
+    """
+    servers = []
+
+    def start(handler) -> LocalServer:
+        server = LocalServer(handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
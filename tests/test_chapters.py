@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from pyladies_dashboard.chapters import alias_table, canonical_form
+
+
+@pytest.mark.parametrize(
+    ("name", "form"),
+    [
+        ("PyLadies KL", "kuala lumpur"),
+        ("Py Ladies SF Chapter", "san francisco"),
+        ("DC", "washington dc"),
+        ("Washington DC", "washington dc"),
+        ("Mexico City CDMX", "mexico city"),
+        ("São Paulo", "sao paulo"),
+        ("PyLadies", "pyladies"),
+    ],
+)
+def test_canonical_form(name, form):
+    assert canonical_form(name) == form
+
+
+def test_variants_share_a_key():
+    aliases = alias_table(
+        pd.Series(["NYC", "New York City", "PyLadies NYC", "Berlin"]),
+        pd.Series([5, 2, 1, 3]),
+    )
+    assert aliases.set_index("chapter").to_dict("index") == {
+        "Berlin": {"chapter_key": "berlin", "canonical": "Berlin"},
+        "NYC": {"chapter_key": "new york city", "canonical": "NYC"},
+        "New York City": {"chapter_key": "new york city", "canonical": "NYC"},
+        "PyLadies NYC": {"chapter_key": "new york city", "canonical": "NYC"},
+    }
+
+
+@pytest.mark.parametrize(
+    ("name", "other"),
+    [
+        ("Cambridge", "Cambridge MA"),
+        ("Cambridge UK", "Cambridge MA"),
+        ("San Jose", "San Jose CR"),
+        ("Washington", "Washington DC"),
+        ("Portland", "Portland OR"),
+    ],
+)
+def test_qualified_names_stay_apart(name, other):
+    aliases = alias_table(pd.Series([name, other]), pd.Series([5, 1]))
+    assert aliases["chapter"].tolist() == aliases["canonical"].tolist()
+    assert aliases["chapter_key"].nunique() == 2
+
+
+@pytest.mark.parametrize(
+    ("name", "typo"),
+    [
+        ("New York City", "New Yorc City"),
+        ("Buenos Aires", "PyLadies Buenos Airess"),
+        ("Buenos Aires", "Bueno Aires"),
+    ],
+)
+def test_typos_join_their_chapter(name, typo):
+    aliases = alias_table(pd.Series([name, typo]), pd.Series([5, 1]))
+    assert aliases["canonical"].tolist() == [name, name]
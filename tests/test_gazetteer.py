@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from pyladies_dashboard.gazetteer import Gazetteer, load_gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return load_gazetteer()
+
+
+@pytest.mark.parametrize(
+    ("query", "name", "country"),
+    [
+        ("Austin", "Austin", "United States"),
+        ("Munich", "Munich", "Germany"),
+        ("Muenchen", "Munich", "Germany"),
+        ("Portland", "Portland", "United States"),
+        ("Ibadan", "Ibadan", "Nigeria"),
+        ("Cambridge", "Cambridge", "United Kingdom"),
+        ("San Jose", "San Jose", "United States"),
+        ("Sao Paulo", "São Paulo", "Brazil"),
+        ("Lagos, Nigeria", "Lagos", "Nigeria"),
+        ("Aba / Abia State", "Aba", "Nigeria"),
+        ("kuala lumpur", "Kuala Lumpur", "Malaysia"),
+    ],
+)
+def test_places_are_found(gazetteer, query, name, country):
+    place = gazetteer.places.iloc[gazetteer.match(query)]
+    assert (place["name"], place["country"]) == (name, country)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Remote Europe",
+        "Espanol",
+        "Mexico",
+        "Abia",
+        "Wake",
+        "Ghana North",
+        "Taiwan North",
+        "Ghana",
+        "Africa",
+        "North",
+        "Remote",
+    ],
+)
+def test_other_names_are_missed(gazetteer, query):
+    assert gazetteer.geocode(query) is None
+
+
+def places(*rows):
+    return pd.DataFrame(
+        rows,
+        columns=["name", "alternates", "latitude", "longitude", "country"],
+    ).assign(population=range(len(rows), 0, -1))
+
+
+def test_own_names_win_over_alternates():
+    # Oldtown is the more populous, but only an alternate of "Newport"
+    gazetteer = Gazetteer(
+        places(
+            ("Oldtown", "Newport", 1, 1, "A"),
+            ("Newport", "", 2, 2, "B"),
+        )
+    )
+    assert gazetteer.geocode("Newport")["country"] == "B"
+    assert gazetteer.geocode("Oldtown")["country"] == "A"
+
+
+def test_fuzzy_needs_a_clear_lead():
+    gazetteer = Gazetteer(
+        places(
+            ("Springfield", "", 1, 1, "A"),
+            ("Springfeld", "", 2, 2, "B"),
+            ("Marlborough", "", 3, 3, "C"),
+        )
+    )
+    assert gazetteer.geocode("Springfiel")["country"] == "A"
+    assert gazetteer.geocode("Marlborogh")["country"] == "C"
+    # about as much like either
+    assert gazetteer.geocode("Springfild") is None
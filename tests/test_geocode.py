@@ -0,0 +1,121 @@
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from pyladies_dashboard.geocode import Geocoder
+
+RATE = 20
+
+
+def expected(query: str) -> dict | None:
+    if query.startswith("Nowhere"):
+        return None
+    h = hashlib.sha256(query.encode()).digest()
+    return {
+        "latitude": h[0] / 255 * 180 - 90,
+        "longitude": h[1] / 255 * 360 - 180,
+        "country": f"Country {h[2] % 10}",
+    }
+
+
+class FakeGeocodeAPI(BaseHTTPRequestHandler):
+    """``/search?q=...`` like geocode.maps.co.
+
+    Queries starting with "Limited" get a 429 and those starting with
+    "Flaky" a 503 on their first attempt; "Broken" ones always fail.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        with self.server.lock:
+            attempt = sum(q == query for _, q in self.server.requests)
+            self.server.requests.append((time.monotonic(), query))
+        status, body = 200, b"[]"
+        if query.startswith("Broken"):
+            status = 503
+        elif attempt == 0 and query.startswith("Limited"):
+            status = 429
+        elif attempt == 0 and query.startswith("Flaky"):
+            status = 503
+        elif result := expected(query):
+            body = json.dumps([
+                {
+                    "lat": str(result["latitude"]),
+                    "lon": str(result["longitude"]),
+                    "display_name": f"{query}, {result['country']}",
+                }
+            ]).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(serve):
+    return serve(FakeGeocodeAPI)
+
+
+def geocoder(api, **kwargs) -> Geocoder:
+    return Geocoder(url=f"{api.url}/search", rate=RATE, backoff=0.01, **kwargs)
+
+
+def test_every_query_resolves_within_the_rate(api):
+    queries = [f"Chapter {i}" for i in range(20)]
+    queries += [f"Limited {i}" for i in range(5)]
+    queries += [f"Flaky {i}" for i in range(5)]
+    queries += [f"Nowhere {i}" for i in range(5)]
+    lookups = list(geocoder(api).geocode_many(queries + queries[:5]))
+
+    assert sorted(lookup.query for lookup in lookups) == sorted(queries)
+    for lookup in lookups:
+        assert lookup.error is None
+        assert lookup.result == pytest.approx(expected(lookup.query))
+
+    # 429s and 503s were retried once each
+    assert len(api.requests) == len(queries) + 10
+    # the bucket lets one request through at once, then one per 1 / RATE
+    # seconds: any n + 1 requests span at least n / RATE seconds, less
+    # the time a request can take to arrive (a new connection, a busy CI
+    # machine), allowed up to two intervals
+    times = sorted(t for t, _ in api.requests)
+    n = RATE // 2
+    spans = [b - a for a, b in zip(times, times[n:])]
+    assert min(spans) >= (n - 2) / RATE
+    assert len(times) / (times[-1] - times[0]) <= RATE * 1.05
+
+
+def test_retries_are_bounded(api):
+    [lookup] = geocoder(api, retries=3).geocode_many(["Broken"])
+    assert lookup.result is None
+    assert lookup.error == "'Broken': HTTP 503"
+    assert len(api.requests) == 4
+
+
+@pytest.mark.parametrize(
+    ("retry_after", "delay"),
+    [("2", 2.0), ("86400", 30.0), ("inf", 30.0), ("-5", 0.0)],
+)
+def test_retry_after_is_clamped(retry_after, delay):
+    response = SimpleNamespace(headers={"Retry-After": retry_after})
+    assert Geocoder(max_backoff=30)._delay(0, response) == delay
+
+
+@pytest.mark.parametrize("retry_after", ["nan", "Wed, 21 Oct 2015 07:28:00"])
+def test_unusable_retry_after_backs_off(retry_after):
+    response = SimpleNamespace(headers={"Retry-After": retry_after})
+    delay = Geocoder(backoff=0.5, max_backoff=30)._delay(2, response)
+    assert 1.0 <= delay <= 3.0
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyladies_dashboard.nearby import ChapterIndex
+
+
+@pytest.fixture
+def index():
+    return ChapterIndex(
+        pd.DataFrame({
+            "Chapter": ["Amsterdam", "Berlin", "Dublin", "Boston"],
+            "longitude": [4.90, 13.40, -6.26, -71.06],
+            "latitude": [52.37, 52.52, 53.35, 42.36],
+        })
+    )
+
+
+@pytest.mark.parametrize(
+    ("k", "expected"),
+    [
+        (2, ["Amsterdam", "Berlin"]),
+        (3.5, ["Amsterdam", "Berlin", "Dublin"]),
+        ("2", ["Amsterdam", "Berlin"]),
+        (0, ["Amsterdam"]),
+        (-3, ["Amsterdam"]),
+        (50, ["Amsterdam", "Berlin", "Dublin", "Boston"]),
+    ],
+)
+def test_nearest_clamps_k(index, k, expected):
+    nearest = index.nearest(4.89, 52.37, k)
+    assert nearest["Chapter"].tolist() == expected
+    assert nearest["distance_km"].is_monotonic_increasing
+
+
+def test_nearest_of_no_chapters():
+    index = ChapterIndex(
+        pd.DataFrame({"longitude": [], "latitude": []}, dtype=float)
+    )
+    assert index.nearest(0, 0, 5).empty
+
+
+@pytest.mark.parametrize(
+    ("radius_km", "expected"),
+    [
+        (660, ["Amsterdam", "Berlin"]),
+        ("660", ["Amsterdam", "Berlin"]),
+        (0, []),
+        (-100, []),
+    ],
+)
+def test_within_clamps_radius(index, radius_km, expected):
+    within = index.within(4.0, 52.37, radius_km)
+    assert within["Chapter"].tolist() == expected
+
+
+def test_distances_are_great_circle_km(index):
+    # Amsterdam to Berlin is about 577 km
+    ids, km = index.nearest_ids(4.90, 52.37, 2)
+    assert ids.tolist() == [0, 1]
+    np.testing.assert_allclose(km, [0, 577], atol=2)
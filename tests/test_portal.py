@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from pyladies_dashboard.portal import CircuitOpenError, StatsClient
+
+PAYLOAD = {
+    "stats": {
+        "volunteer_breakdown": [
+            {
+                "chart_id": "volunteer_by_chapter",
+                "columns": ["Chapter", "Volunteers"],
+                "data": [[f"Chapter {i}", i % 7 + 1] for i in range(2000)],
+            }
+        ]
+    }
+}
+BODY = json.dumps(PAYLOAD).encode()
+ETAG = f'"{hashlib.sha256(BODY).hexdigest()[:16]}"'
+
+
+class FakePortal(BaseHTTPRequestHandler):
+    """stats.json with an ETag, gzipped when asked. The next
+    ``server.failures`` requests get ``server.status`` instead (-1: all of
+    them), with ``server.retry_after`` as their Retry-After if set. Each
+    request is recorded as ``(status, body bytes sent, request headers)``.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            failing = server.failures != 0
+            if server.failures > 0:
+                server.failures -= 1
+        headers = {"ETag": ETAG, "Content-Type": "application/json"}
+        if failing:
+            status, body, headers = server.status, b"", {}
+            if server.retry_after is not None:
+                headers["Retry-After"] = server.retry_after
+        elif self.headers.get("If-None-Match") == ETAG:
+            status, body = 304, b""
+        elif "gzip" in self.headers.get("Accept-Encoding", ""):
+            status, body = 200, gzip.compress(BODY)
+            headers["Content-Encoding"] = "gzip"
+        else:
+            status, body = 200, BODY
+        with server.lock:
+            server.requests.append((status, len(body), self.headers))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal(serve):
+    server = serve(FakePortal)
+    server.failures = 0
+    server.status = 503
+    server.retry_after = None
+    return server
+
+
+def client(portal, **kwargs) -> StatsClient:
+    return StatsClient(url=f"{portal.url}/stats.json", **kwargs)
+
+
+def test_304_reuses_the_cached_body(portal):
+    stats = client(portal)
+    first = stats.fetch()
+    second = stats.fetch()
+
+    assert not first.not_modified
+    assert second.not_modified
+    assert second.payload == first.payload == PAYLOAD
+    assert second.content == first.content == BODY
+    (_, sent, _), (status, resent, headers) = portal.requests
+    assert headers["If-None-Match"] == ETAG
+    assert (status, resent) == (304, 0)
+    assert sent > 0
+
+
+def test_gzip_is_negotiated(portal):
+    response = client(portal).fetch()
+
+    [(status, sent, headers)] = portal.requests
+    assert "gzip" in headers["Accept-Encoding"]
+    assert response.payload == PAYLOAD
+    assert status == 200
+    assert sent < len(BODY) / 5
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_transient_errors_are_retried(portal, status):
+    portal.status, portal.failures = status, 1
+    assert client(portal, retries=2).fetch().payload == PAYLOAD
+    assert [s for s, _, _ in portal.requests] == [status, 200]
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_are_bounded(portal, status):
+    portal.status, portal.failures = status, -1
+    with pytest.raises(requests.HTTPError):
+        client(portal, retries=2).fetch()
+    assert len(portal.requests) == 3
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retry_after_is_capped(portal, status):
+    portal.status, portal.failures, portal.retry_after = status, 1, "3600"
+    start = time.monotonic()
+    assert client(portal, max_backoff=0.2).fetch().payload == PAYLOAD
+    assert time.monotonic() - start < 2
+    assert [s for s, _, _ in portal.requests] == [status, 200]
+
+
+def test_circuit_opens_and_half_opens(portal):
+    stats = client(portal, retries=0, failure_threshold=2, reset_after=0.3)
+    portal.failures = -1
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            stats.fetch()
+
+    # open: fails without a request
+    with pytest.raises(CircuitOpenError):
+        stats.fetch()
+    assert len(portal.requests) == 2
+
+    # half-open: one trial request, which fails and opens it again
+    time.sleep(0.35)
+    with pytest.raises(requests.HTTPError):
+        stats.fetch()
+    with pytest.raises(CircuitOpenError):
+        stats.fetch()
+    assert len(portal.requests) == 3
+
+    # half-open again: the trial succeeds and closes it
+    portal.failures = 0
+    time.sleep(0.35)
+    assert stats.fetch().payload == PAYLOAD
+    assert stats.fetch().not_modified
+    assert len(portal.requests) == 5
@@ -0,0 +1,98 @@
+import json
+
+import pandas as pd
+import pytest
+
+from pyladies_dashboard import recode, snapshot
+from pyladies_dashboard.geocache import GeocodeCache
+
+STATS = json.dumps({
+    "stats": {
+        "volunteer_breakdown": [
+            {
+                "chart_id": "volunteer_by_chapter",
+                "columns": ["Chapter", "Volunteers"],
+                "data": [["Lima", 3], ["Berlin", 5]],
+            }
+        ]
+    }
+}).encode()
+
+
+@pytest.fixture
+def no_portal(monkeypatch, tmp_path):
+    """An empty snapshot directory, and a portal that can't be reached"""
+
+    def fetch():
+        raise AssertionError("fetched from the portal")
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    monkeypatch.setattr(recode.stats_client, "fetch", fetch)
+
+
+def test_offline_uses_the_snapshot(no_portal):
+    snapshot.write_snapshot(STATS, 1e9)
+    by_chapter = recode.fetch(recode.stats_content(offline=True))
+    assert by_chapter.to_dict("list") == {
+        "Chapter": ["Berlin", "Lima"],
+        "Volunteers": [5, 3],
+    }
+
+
+def test_offline_without_a_snapshot_fails(no_portal):
+    with pytest.raises(FileNotFoundError, match="--stats"):
+        recode.stats_content(offline=True)
+
+
+def test_stats_file(no_portal, tmp_path):
+    path = tmp_path / "stats.json"
+    path.write_bytes(STATS)
+    assert recode.stats_content(path) == STATS
+    assert snapshot.read_snapshot() is None
+
+
+def test_chapters_are_geocoded_by_expanded_name(monkeypatch, tmp_path):
+    queries = []
+
+    class Gazetteer:
+        source = "gazetteer"
+
+        def geocode(self, query):
+            queries.append(query)
+            return {"latitude": 3.1, "longitude": 101.7, "country": "MY"}
+
+    monkeypatch.setattr(recode, "load_gazetteer", Gazetteer)
+    by_chapter = pd.DataFrame({
+        "Chapter": ["KL", "PyLadies KL"],
+        "Volunteers": [4, 1],
+    })
+    _, clusters = recode.normalize(by_chapter)
+    cache = GeocodeCache(tmp_path / "geocode.sqlite")
+    try:
+        geocoded = recode.geocode(clusters, cache, offline=True)
+    finally:
+        cache.close()
+
+    assert queries == ["Kuala Lumpur"]
+    assert geocoded[["chapter", "volunteers", "latitude"]].to_dict(
+        "records"
+    ) == [{"chapter": "KL", "volunteers": 5, "latitude": 3.1}]
+
+
+def test_split_names_are_located(tmp_path):
+    by_chapter = pd.DataFrame({
+        "Chapter": ["Aba / Abia State", "PyLadies Lagos, Nigeria"],
+        "Volunteers": [2, 3],
+    })
+    _, clusters = recode.normalize(by_chapter)
+    cache = GeocodeCache(tmp_path / "geocode.sqlite")
+    try:
+        geocoded = recode.geocode(clusters, cache, offline=True)
+        cached = cache.lookup(clusters["chapter_key"])
+    finally:
+        cache.close()
+
+    assert geocoded["country_geo"].tolist() == ["Nigeria", "Nigeria"]
+    assert geocoded["latitude"].notna().all()
+    # cached by key, not by the name looked up
+    assert sorted(cached) == ["aba abia state", "lagos nigeria"]